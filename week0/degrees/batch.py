@@ -0,0 +1,67 @@
+import csv
+import json
+import multiprocessing
+import sys
+
+import degrees
+import server
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python batch.py directory pairs.csv [processes]")
+    directory = sys.argv[1]
+    filename = sys.argv[2]
+    processes = int(sys.argv[3]) if len(sys.argv) == 4 else None
+
+    # Loading before the pool starts lets forked workers share the graph
+    print("Loading data...", file=sys.stderr)
+    degrees.load_graph(directory)
+    print("Data loaded.", file=sys.stderr)
+
+    with open(filename, encoding="utf-8") as f:
+        for response in run(directory, read_pairs(f), processes):
+            print(json.dumps(response), flush=True)
+
+
+def read_pairs(f):
+    """
+    Yields (line, source, target) for each row of a two column CSV file
+    of people, given by IMDB id or name. Blank lines are skipped.
+    """
+    for line, row in enumerate(csv.reader(f), 1):
+        if len(row) >= 2:
+            yield line, row[0].strip(), row[1].strip()
+
+
+def run(directory, pairs, processes=None, chunksize=16):
+    """
+    Answers (id, source, target) pairs across a pool of processes,
+    yielding server-style responses as soon as each one completes.
+    """
+    with multiprocessing.Pool(
+        processes, initializer=init_worker, initargs=(directory,)
+    ) as pool:
+        yield from pool.imap_unordered(answer_pair, pairs, chunksize)
+
+
+def init_worker(directory):
+    """
+    Makes sure a worker has the graph.
+
+    Forked workers inherit the parent's graph copy-on-write; spawned
+    workers memory-map the same snapshot file instead of receiving
+    a pickled copy.
+    """
+    if degrees.graph is None:
+        degrees.load_graph(directory)
+
+
+def answer_pair(pair):
+    request_id, source, target = pair
+    return server.answer({"id": request_id, "source": source,
+                          "target": target})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import csv
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import degrees
+import snapshot
+from util import QueueFrontier
+
+# Credits per generated dataset when none are given
+SCALES = [1000, 10000, 100000]
+
+# Shortest path queries timed per dataset
+QUERIES = 100
+
+# Largest cast of a generated movie
+MAX_CAST = 200
+
+# Largest dataset the quadratic list frontier is timed on
+LIST_FRONTIER_LIMIT = 10000
+
+ENGINES = ["dict-list", "dict-deque", "dict-bidirectional",
+           "graph", "snapshot"]
+
+
+def main():
+    scales = [int(arg) for arg in sys.argv[1:]] or SCALES
+    report = []
+    for credits in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            sizes = generate(directory, credits)
+            snapshot.load_cached(directory)
+            queries = query_set(directory, QUERIES)
+            results = []
+            for engine in ENGINES:
+                if engine == "dict-list" and credits > LIST_FRONTIER_LIMIT:
+                    continue
+                print(f"{credits} credits: {engine}...", file=sys.stderr)
+                results.append(measure(engine, directory, queries))
+            report.append({"credits": credits, **sizes, "queries": len(queries),
+                           "results": results})
+    print(json.dumps(report, indent=4))
+
+
+def generate(directory, credits, seed=0):
+    """
+    Writes an IMDB-like people/movies/stars dataset with about credits
+    star rows into directory.
+
+    Cast sizes follow a power law, and a few prolific people appear in
+    far more movies than most. Returns the number of each row written.
+    """
+    rng = random.Random(seed)
+    people = max(2, credits // 4)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="",
+              encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(people):
+            writer.writerow([person, f"Person {person}", 1900 + person % 100])
+
+    movies = 0
+    stars = 0
+    with open(os.path.join(directory, "movies.csv"), "w", newline="",
+              encoding="utf-8") as m, \
+            open(os.path.join(directory, "stars.csv"), "w", newline="",
+                 encoding="utf-8") as s:
+        movie_writer = csv.writer(m)
+        movie_writer.writerow(["id", "title", "year"])
+        star_writer = csv.writer(s)
+        star_writer.writerow(["person_id", "movie_id"])
+        while stars < credits:
+            movie = people + movies
+            movie_writer.writerow([movie, f"Movie {movies}", 1900 + movies % 120])
+            cast = min(MAX_CAST, int(rng.paretovariate(1.5)), credits - stars)
+            for _ in range(cast):
+                # Squaring skews picks towards a core of prolific people
+                person = int(people * rng.random() ** 2)
+                star_writer.writerow([person, movie])
+            movies += 1
+            stars += cast
+    return {"people": people, "movies": movies, "stars": stars}
+
+
+def query_set(directory, count, seed=0):
+    """
+    Returns count reproducible (source, target) pairs of person ids.
+    """
+    with open(os.path.join(directory, "people.csv"), encoding="utf-8") as f:
+        person_ids = [row["id"] for row in csv.DictReader(f)]
+    rng = random.Random(seed)
+    return [tuple(rng.sample(person_ids, 2)) for _ in range(count)]
+
+
+def measure(engine, directory, queries):
+    """
+    Times engine in a fresh process, so each gets its own peak RSS.
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        return pool.apply(run, (engine, directory, queries))
+
+
+def run(engine, directory, queries):
+    """
+    Loads the data with engine, then times neighbors_for_person and
+    shortest_path over queries. Returns the timings as a dict.
+    """
+    # Count expansions of the dict searches, which all go through
+    # neighbors_for_person
+    expanded = [0]
+    neighbors_for_person = degrees.neighbors_for_person
+
+    def counted(person_id):
+        expanded[0] += 1
+        return neighbors_for_person(person_id)
+
+    start = time.perf_counter()
+    if engine == "graph":
+        degrees.load_graph(directory, cache=False)
+    elif engine == "snapshot":
+        degrees.load_graph(directory, cache=True)
+    else:
+        degrees.load_data(directory)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for source, _ in queries:
+        for _ in degrees.neighbors_for_person(source):
+            pass
+    neighbors_seconds = time.perf_counter() - start
+
+    degrees.neighbors_for_person = counted
+    connected = 0
+    start = time.perf_counter()
+    for source, target in queries:
+        if engine == "dict-list":
+            path = degrees.shortest_path(source, target,
+                                         frontier=QueueFrontier())
+        elif engine == "dict-bidirectional":
+            path = degrees.shortest_path(source, target, bidirectional=True)
+        else:
+            path = degrees.shortest_path(source, target)
+        connected += path is not None
+    search_seconds = time.perf_counter() - start
+    degrees.neighbors_for_person = neighbors_for_person
+
+    if degrees.graph is not None:
+        expanded[0] = degrees.graph.expanded
+
+    return {
+        "engine": engine,
+        "load_seconds": load_seconds,
+        "neighbors_seconds": neighbors_seconds,
+        "search_seconds": search_seconds,
+        "connected": connected,
+        "expanded": expanded[0],
+        "expanded_per_second": (expanded[0] / search_seconds
+                                if search_seconds else None),
+        # Kilobytes on Linux
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+
+if __name__ == "__main__":
+    main()
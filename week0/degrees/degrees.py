@@ -1,7 +1,11 @@
 import csv
+import os
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import snapshot
+from graph import StarGraph
+from landmarks import LandmarkIndex
+from util import Node, StackFrontier, QueueFrontier, DequeQueueFrontier, PathCache
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,6 +16,15 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact StarGraph of the same data, used instead of the dicts once loaded
+graph = None
+
+# LandmarkIndex over graph, built on demand by load_landmarks
+landmarks = None
+
+# Recently answered shortest paths, keyed on (source, target)
+path_cache = PathCache()
+
 
 def load_data(directory):
     """
@@ -52,6 +65,155 @@ def load_data(directory):
                 pass
 
 
+def load_graph(directory, cache=True):
+    """
+    Load data from CSV files into a compact StarGraph.
+
+    If cache is True, the graph is memory-mapped from a snapshot kept next
+    to the CSV files, which is rebuilt whenever the CSV files change.
+    """
+    global graph
+    if cache:
+        graph = snapshot.load_cached(directory)
+    else:
+        graph = StarGraph.from_csv(directory)
+    return graph
+
+
+def load_landmarks(count=16):
+    """
+    Build a LandmarkIndex of distances from count well-connected people,
+    for bounds on degrees of separation without a full search.
+    """
+    global landmarks
+    landmarks = LandmarkIndex.build(graph, count)
+    return landmarks
+
+
+def load_updates(directory):
+    """
+    Add the rows of any people.csv, movies.csv and stars.csv files in
+    directory to the data already loaded.
+    """
+    rows = read_updates(directory)
+    return apply_updates(rows["people"], rows["movies"], rows["stars"])
+
+
+def read_updates(directory):
+    """
+    Returns a dict of the "people", "movies" and "stars" rows of any
+    people.csv, movies.csv and stars.csv files in directory.
+    """
+    rows = {}
+    for name in ["people", "movies", "stars"]:
+        filename = os.path.join(directory, f"{name}.csv")
+        if os.path.exists(filename):
+            with open(filename, encoding="utf-8") as f:
+                rows[name] = list(csv.DictReader(f))
+        else:
+            rows[name] = []
+    return rows
+
+
+def apply_updates(people_rows, movie_rows, star_rows):
+    """
+    Add people, movies and stars, given as rows shaped like those of
+    the CSV files, to the data already loaded.
+
+    Returns the number of people, movies and stars actually added.
+    """
+    added = {"people": 0, "movies": 0, "stars": 0}
+    for row in people_rows:
+        added["people"] += add_person(row["id"], row["name"], row["birth"])
+    for row in movie_rows:
+        added["movies"] += add_movie(row["id"], row["title"], row["year"])
+    for row in star_rows:
+        added["stars"] += add_star(row["person_id"], row["movie_id"])
+    return added
+
+
+def add_person(person_id, name, birth):
+    """
+    Add a person to the loaded data. Returns False if already known.
+    """
+    if graph is None:
+        if person_id in people:
+            return False
+        people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        names.setdefault(name.lower(), set()).add(person_id)
+        return True
+
+    if person_id in graph.person_index:
+        return False
+    graph.add_person(person_id, name, birth)
+    if landmarks is not None:
+        landmarks.add_person()
+    return True
+
+
+def add_movie(movie_id, title, year):
+    """
+    Add a movie to the loaded data. Returns False if already known.
+    """
+    if graph is None:
+        if movie_id in movies:
+            return False
+        movies[movie_id] = {"title": title, "year": year, "stars": set()}
+        return True
+
+    if movie_id in graph.movie_index:
+        return False
+    graph.add_movie(movie_id, title, year)
+    return True
+
+
+def add_star(person_id, movie_id):
+    """
+    Record that a person starred in a movie, updating the derived
+    indexes and dropping cached paths, which may no longer be shortest.
+
+    Returns False if the star was already known or names an unknown
+    person or movie.
+    """
+    if graph is None:
+        if person_id not in people or movie_id not in movies:
+            return False
+        if movie_id in people[person_id]["movies"]:
+            return False
+        people[person_id]["movies"].add(movie_id)
+        movies[movie_id]["stars"].add(person_id)
+    else:
+        if (person_id not in graph.person_index
+                or movie_id not in graph.movie_index):
+            return False
+        added = graph.add_star(person_id, movie_id)
+        if added is None:
+            return False
+        if landmarks is not None:
+            landmarks.add_star(*added)
+
+    path_cache.clear()
+    return True
+
+
+def person_record(person_id):
+    """
+    Returns a dict with the name and birth of a person.
+    """
+    if graph is not None:
+        return graph.person(person_id)
+    return people[person_id]
+
+
+def movie_record(movie_id):
+    """
+    Returns a dict with the title and year of a movie.
+    """
+    if graph is not None:
+        return graph.movie(movie_id)
+    return movies[movie_id]
+
+
 def main():
     if len(sys.argv) > 2:
         sys.exit("Usage: python degrees.py [directory]")
@@ -59,7 +221,7 @@ def main():
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_graph(directory)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +231,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=True)
 
     if path is None:
         print("Not connected.")
@@ -78,22 +240,36 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_record(path[i][1])["name"]
+            person2 = person_record(path[i + 1][1])["name"]
+            movie = movie_record(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, frontier=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the person with id source to the person with the id target.
 
+    If bidirectional is True, searches from both ends at once
+    (see bidirectional_path).
+
+    Otherwise searches breadth-first with frontier, an empty queue
+    frontier (a DequeQueueFrontier by default).
+
+    Searches the compact graph when one has been loaded with load_graph.
+
     If no possible path, returns None.
     """
+    if graph is not None:
+        return graph.shortest_path(source, target)
+    if bidirectional:
+        return bidirectional_path(source, target)
+
     # Initialize frontier to just the starting position
     start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
+    if frontier is None:
+        frontier = DequeQueueFrontier()
     frontier.add(start)
     explored = set()
 
@@ -121,6 +297,102 @@ def shortest_path(source, target):
                     return(backtrack(child, target))
 
 
+def bidirectional_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    connecting source to target, growing one BFS from each end
+    and joining them where they meet.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Maps person_id to (movie_id, person_id) of the step towards its own end
+    forward = {source: None}
+    backward = {target: None}
+    # Distance of each reached person_id from its own end
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+
+        # Always expand the smaller layer
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meeting = expand_layer(
+                forward_layer, forward, forward_depth, backward_depth
+            )
+        else:
+            backward_layer, meeting = expand_layer(
+                backward_layer, backward, backward_depth, forward_depth
+            )
+
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+    return None
+
+
+def expand_layer(layer, parents, depth, other_depth):
+    """
+    Expands a whole BFS layer, recording parents and depths.
+
+    Returns the next layer and the person_id where this search
+    meets the other one on the shortest combined path (or None).
+    """
+    next_layer = []
+    meeting = None
+    best = None
+    for person_id in layer:
+        for movie_id, neighbor in neighbors_for_person(person_id):
+            if neighbor not in parents:
+                parents[neighbor] = (movie_id, person_id)
+                depth[neighbor] = depth[person_id] + 1
+                next_layer.append(neighbor)
+            if neighbor in other_depth:
+                length = depth[neighbor] + other_depth[neighbor]
+                if best is None or length < best:
+                    best = length
+                    meeting = neighbor
+    return next_layer, meeting
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Joins the forward and backward parent chains at meeting into
+    a list of (movie_id, person_id) pairs from source to target.
+    """
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent
+    path.reverse()
+
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, child = backward[person_id]
+        path.append((movie_id, child))
+        person_id = child
+    return path
+
+
+def cached_shortest_path(source, target):
+    """
+    Returns shortest_path(source, target), answering repeated
+    queries from path_cache.
+    """
+    key = (source, target)
+    if key in path_cache:
+        return path_cache.get(key)
+    path = shortest_path(source, target, bidirectional=True)
+    path_cache.put(key, path)
+    return path
+
+
 # Backtrack through node-parents
 def backtrack(node, target):
     if node.state == target:
@@ -141,13 +413,16 @@ def person_id_for_name(name):
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if graph is not None:
+        person_ids = graph.person_ids_for_name(name)
+    else:
+        person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_record(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -166,7 +441,11 @@ def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
+
+    With a graph loaded, the pairs are yielded straight off its arrays.
     """
+    if graph is not None:
+        return graph.neighbors(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,458 @@
+import csv
+from array import array
+from itertools import chain
+
+from nameindex import NameIndex
+
+
+class StarGraph():
+    """
+    Compact representation of the star network.
+
+    People and movies are interned to dense integer indices, and the
+    bipartite person <-> movie adjacency is stored in CSR form:
+    the movies of person p are
+        person_movies[person_offsets[p]:person_offsets[p + 1]]
+    and the stars of movie m are
+        movie_people[movie_offsets[m]:movie_offsets[m + 1]]
+    plus any stars added later in extra_movies[p] and extra_people[m]
+    (see movies_of and stars_of).
+    """
+
+    def __init__(self):
+        # Index -> IMDB id / attributes
+        self.person_ids = []
+        self.names = []
+        self.births = []
+        self.movie_ids = []
+        self.titles = []
+        self.years = []
+
+        # IMDB id -> index
+        self.person_index = {}
+        self.movie_index = {}
+
+        # CSR adjacency; the neighbour lists are memoryviews, so that
+        # slicing them does not copy
+        self.person_offsets = array("i", [0])
+        self.person_movies = memoryview(array("i"))
+        self.movie_offsets = array("i", [0])
+        self.movie_people = memoryview(array("i"))
+
+        # Connected component of each person, and size of each component
+        self.components = array("i")
+        self.component_sizes = array("i")
+
+        # Stars added after the graph was built, outside the CSR arrays:
+        # person index -> list of movie indices, movie index -> list of people
+        self.extra_movies = {}
+        self.extra_people = {}
+        # Component numbers folded into another by later stars
+        self.merged = {}
+
+        # NameIndex over names, built on first use
+        self.name_index = None
+
+        # Number of people expanded by searches so far
+        self.expanded = 0
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Builds a graph from the people, movies and stars CSV files
+        in directory.
+        """
+        with open(f"{directory}/people.csv", encoding="utf-8") as people, \
+                open(f"{directory}/movies.csv", encoding="utf-8") as movies, \
+                open(f"{directory}/stars.csv", encoding="utf-8") as stars:
+            return cls.build(
+                csv.DictReader(people),
+                csv.DictReader(movies),
+                csv.DictReader(stars)
+            )
+
+    @classmethod
+    def build(cls, people, movies, stars):
+        """
+        Builds a graph from iterables of row dicts shaped like the
+        rows of people.csv, movies.csv and stars.csv.
+
+        Star rows naming an unknown person or movie are skipped.
+        """
+        graph = cls()
+        for row in people:
+            graph.person_index[row["id"]] = len(graph.person_ids)
+            graph.person_ids.append(row["id"])
+            graph.names.append(row["name"])
+            graph.births.append(row["birth"])
+        for row in movies:
+            graph.movie_index[row["id"]] = len(graph.movie_ids)
+            graph.movie_ids.append(row["id"])
+            graph.titles.append(row["title"])
+            graph.years.append(row["year"])
+
+        star_people = array("i")
+        star_movies = array("i")
+        for row in stars:
+            person = graph.person_index.get(row["person_id"])
+            movie = graph.movie_index.get(row["movie_id"])
+            if person is None or movie is None:
+                continue
+            star_people.append(person)
+            star_movies.append(movie)
+
+        graph.person_offsets, person_movies = build_csr(
+            len(graph.person_ids), star_people, star_movies
+        )
+        graph.movie_offsets, movie_people = build_csr(
+            len(graph.movie_ids), star_movies, star_people
+        )
+        graph.person_movies = memoryview(person_movies)
+        graph.movie_people = memoryview(movie_people)
+        graph.components, graph.component_sizes = label_components(
+            len(graph.person_ids), star_people, star_movies
+        )
+        return graph
+
+    def person(self, person_id):
+        """Returns a dict with the name and birth of a person."""
+        index = self.person_index[person_id]
+        return {"name": self.names[index], "birth": self.births[index]}
+
+    def movie(self, movie_id):
+        """Returns a dict with the title and year of a movie."""
+        index = self.movie_index[movie_id]
+        return {"title": self.titles[index], "year": self.years[index]}
+
+    def component(self, person_id):
+        """Returns the connected component number of a person."""
+        return self.component_of(self.person_index[person_id])
+
+    def component_of(self, person):
+        """Returns the connected component number of a person index."""
+        label = self.components[person]
+        while label in self.merged:
+            label = self.merged[label]
+        return label
+
+    def component_size(self, person_id):
+        """Returns the number of people in a person's connected component."""
+        return self.component_sizes[self.component(person_id)]
+
+    def connected(self, source, target):
+        """Returns True if there is any path between two people."""
+        return self.component(source) == self.component(target)
+
+    def movies_of(self, person):
+        """Returns the movie indices of a person index, without copying."""
+        movies = self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+        if person in self.extra_movies:
+            return chain(movies, self.extra_movies[person])
+        return movies
+
+    def movie_count(self, person):
+        """Returns the number of movies of a person index."""
+        count = self.person_offsets[person + 1] - self.person_offsets[person]
+        return count + len(self.extra_movies.get(person, []))
+
+    def star_count(self, movie):
+        """Returns the number of stars of a movie index."""
+        count = self.movie_offsets[movie + 1] - self.movie_offsets[movie]
+        return count + len(self.extra_people.get(movie, []))
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices of the stars of a movie index,
+        without copying.
+        """
+        people = self.movie_people[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+        if movie in self.extra_people:
+            return chain(people, self.extra_people[movie])
+        return people
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person with no movies yet. Returns their person index.
+        """
+        self.thaw()
+        person = len(self.person_ids)
+        self.person_index[person_id] = person
+        self.person_ids.append(person_id)
+        self.names.append(name)
+        self.births.append(birth)
+        self.person_offsets.append(self.person_offsets[-1])
+        self.components.append(len(self.component_sizes))
+        self.component_sizes.append(1)
+        if self.name_index is not None:
+            self.name_index.add(person)
+        return person
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie with no stars yet. Returns its movie index.
+        """
+        self.thaw()
+        movie = len(self.movie_ids)
+        self.movie_index[movie_id] = movie
+        self.movie_ids.append(movie_id)
+        self.titles.append(title)
+        self.years.append(year)
+        self.movie_offsets.append(self.movie_offsets[-1])
+        return movie
+
+    def add_star(self, person_id, movie_id):
+        """
+        Records that a person starred in a movie, merging their
+        components if needed.
+
+        Returns (person, movie) indices, or None if the star was
+        already known.
+        """
+        person = self.person_index[person_id]
+        movie = self.movie_index[movie_id]
+        if movie in self.movies_of(person):
+            return None
+        self.thaw()
+
+        # Any current star of the movie joins the person's component
+        for star in self.stars_of(movie):
+            a, b = self.component_of(person), self.component_of(star)
+            if a != b:
+                self.component_sizes[b] += self.component_sizes[a]
+                self.merged[a] = b
+            break
+
+        self.extra_movies.setdefault(person, []).append(movie)
+        self.extra_people.setdefault(movie, []).append(person)
+        return person, movie
+
+    def thaw(self):
+        """
+        Copies arrays that get appended to out of a read-only snapshot.
+        """
+        for name in ["person_offsets", "movie_offsets",
+                     "components", "component_sizes"]:
+            if not isinstance(getattr(self, name), array):
+                setattr(self, name, array("i", bytes(getattr(self, name))))
+
+    def names_index(self):
+        """Returns the NameIndex of this graph, building it if needed."""
+        if self.name_index is None:
+            self.name_index = NameIndex(self)
+        return self.name_index
+
+    def person_ids_for_name(self, name):
+        """Returns the list of person_ids with a given (any case) name."""
+        return [self.person_ids[person]
+                for person in self.names_index().exact(name)]
+
+    def search_names(self, name, limit=10):
+        """
+        Returns up to limit ranked candidate person_ids for name,
+        tolerating prefixes and single typos.
+        """
+        return self.names_index().lookup(name, limit)
+
+    def neighbors(self, person_id):
+        """
+        Yields (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        for movie in self.movies_of(self.person_index[person_id]):
+            for person in self.stars_of(movie):
+                yield self.movie_ids[movie], self.person_ids[person]
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the person with id source to the person with id target.
+
+        If no possible path, returns None.
+        """
+        path = self.search(
+            self.person_index[source], self.person_index[target]
+        )
+        if path is None:
+            return None
+        return [(self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path]
+
+    def search(self, source, target):
+        """
+        Bidirectional BFS between two person indices.
+
+        Returns the shortest list of (movie, person) index pairs
+        from source to target, or None if they are not connected.
+        """
+        if source == target:
+            return []
+
+        # People in different components are never connected
+        if self.component_of(source) != self.component_of(target):
+            return None
+
+        forward = Side(source)
+        backward = Side(target)
+        while forward.layer and backward.layer:
+            if len(forward.layer) <= len(backward.layer):
+                meeting = self.expand(forward, backward)
+            else:
+                meeting = self.expand(backward, forward)
+            if meeting is not None:
+                return join(meeting, forward.parents, backward.parents)
+        return None
+
+    def expand(self, side, other):
+        """
+        Expands the current layer of side.
+
+        Returns the person index where side meets other on the
+        shortest combined path, or None if they have not met.
+        """
+        movies_of, stars_of = self.movies_of, self.stars_of
+        parents, depth, seen_movies = side.parents, side.depth, side.movies
+        other_depth = other.depth
+
+        next_layer = []
+        meeting = None
+        best = None
+        for person in side.layer:
+            next_depth = depth[person] + 1
+            for movie in movies_of(person):
+
+                # Every star of a movie is reached the first time it is seen
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+
+                for neighbor in stars_of(movie):
+                    if neighbor not in depth:
+                        parents[neighbor] = (movie, person)
+                        depth[neighbor] = next_depth
+                        next_layer.append(neighbor)
+                    if neighbor in other_depth:
+                        length = depth[neighbor] + other_depth[neighbor]
+                        if best is None or length < best:
+                            best = length
+                            meeting = neighbor
+        self.expanded += len(side.layer)
+        side.layer = next_layer
+        return meeting
+
+
+class Side():
+    """State of one direction of a bidirectional search."""
+
+    def __init__(self, start):
+        # Maps person index to (movie, person) step towards start
+        self.parents = {start: None}
+        self.depth = {start: 0}
+        self.movies = set()
+        self.layer = [start]
+
+
+def build_csr(count, sources, targets):
+    """
+    Returns (offsets, indices) arrays grouping targets by source,
+    for sources in range(count).
+    """
+    offsets = array("i", [0]) * (count + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    indices = array("i", [0]) * len(targets)
+    fill = offsets[:-1]
+    for source, target in zip(sources, targets):
+        indices[fill[source]] = target
+        fill[source] += 1
+
+    # Drop repeated rows, as the sets of the dict loader do
+    write = 0
+    for source in range(count):
+        start, end = offsets[source], offsets[source + 1]
+        offsets[source] = write
+        if end - start == 1:
+            indices[write] = indices[start]
+            write += 1
+            continue
+        seen = set()
+        for i in range(start, end):
+            if indices[i] not in seen:
+                seen.add(indices[i])
+                indices[write] = indices[i]
+                write += 1
+    offsets[count] = write
+    del indices[write:]
+    return offsets, indices
+
+
+def label_components(count, sources, targets):
+    """
+    Labels the connected components of people in range(count), linked
+    through the movies they share, by union-find over star rows
+    (person, movie) given as sources and targets.
+
+    Returns (labels, sizes): the component number of each person and
+    the number of people in each component.
+    """
+    parent = array("i", range(count))
+    first_star = {}
+
+    def find(person):
+        root = person
+        while parent[root] != root:
+            root = parent[root]
+        # Compress the path
+        while parent[person] != root:
+            parent[person], person = root, parent[person]
+        return root
+
+    # Union every star of a movie with its first star
+    for person, movie in zip(sources, targets):
+        if movie not in first_star:
+            first_star[movie] = person
+            continue
+        a = find(person)
+        b = find(first_star[movie])
+        if a != b:
+            parent[a] = b
+
+    # Number components densely in order of first appearance
+    labels = array("i", [0]) * count
+    sizes = array("i")
+    numbers = {}
+    for person in range(count):
+        root = find(person)
+        if root not in numbers:
+            numbers[root] = len(sizes)
+            sizes.append(0)
+        labels[person] = numbers[root]
+        sizes[numbers[root]] += 1
+    return labels, sizes
+
+
+def join(meeting, forward, backward):
+    """
+    Joins forward and backward parent chains at meeting into
+    a list of (movie, person) pairs from source to target.
+    """
+    path = []
+    person = meeting
+    while forward[person] is not None:
+        movie, parent = forward[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+
+    person = meeting
+    while backward[person] is not None:
+        movie, child = backward[person]
+        path.append((movie, child))
+        person = child
+    return path
@@ -0,0 +1,181 @@
+import heapq
+
+from graph import join
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 255
+
+
+class LandmarkIndex():
+    """
+    Distances from a few landmark people to everyone in a StarGraph,
+    one bytearray (uint8 per person) per landmark.
+
+    By the triangle inequality, for any landmark l
+        |d(l, s) - d(l, t)| <= d(s, t) <= d(l, s) + d(l, t)
+    which gives cheap bounds on degrees of separation and an
+    admissible heuristic for A* search.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        # Person indices of the landmarks
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """
+        Builds an index over the count people who starred in most movies.
+        """
+        people = sorted(
+            range(len(graph.person_ids)), key=graph.movie_count, reverse=True
+        )[:count]
+        return cls(graph, people, [distances_from(graph, l) for l in people])
+
+    def add_person(self):
+        """Makes room for a person appended to the graph."""
+        for distances in self.distances:
+            distances.append(UNREACHABLE)
+
+    def add_star(self, person, movie):
+        """
+        Updates distances after the person index person was added as a
+        star of the movie index movie, which can only bring people closer.
+        """
+        for distances in self.distances:
+            closest = min(distances[star] for star in self.graph.stars_of(movie))
+            if closest == UNREACHABLE:
+                continue
+            # Everyone in the movie is now at most one step from closest
+            stars = [star for star in self.graph.stars_of(movie)
+                     if distances[star] > closest + 1]
+            for star in stars:
+                distances[star] = closest + 1
+            relax(self.graph, distances, stars)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        the people with ids source and target.
+
+        upper is None if no landmark reaches them, and both are None
+        if they are not connected at all.
+        """
+        s = self.graph.person_index[source]
+        t = self.graph.person_index[target]
+        if s == t:
+            return 0, 0
+        if self.graph.component_of(s) != self.graph.component_of(t):
+            return None, None
+
+        lower = 1
+        upper = None
+        for distances in self.distances:
+            ds, dt = distances[s], distances[t]
+            if ds == UNREACHABLE or dt == UNREACHABLE:
+                continue
+            lower = max(lower, abs(ds - dt))
+            if upper is None or ds + dt < upper:
+                upper = ds + dt
+        return lower, upper
+
+    def heuristic(self, target):
+        """
+        Returns a function giving a lower bound on the distance
+        from a person index to the person index target.
+        """
+        columns = [(distances, distances[target])
+                   for distances in self.distances
+                   if distances[target] != UNREACHABLE]
+
+        def h(person):
+            best = 0
+            for distances, dt in columns:
+                ds = distances[person]
+                if ds != UNREACHABLE and abs(ds - dt) > best:
+                    best = abs(ds - dt)
+            return best
+        return h
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect source to target, found by A* search guided
+        by the landmark heuristic.
+
+        If no possible path, returns None.
+        """
+        graph = self.graph
+        path = self.search(
+            graph.person_index[source], graph.person_index[target]
+        )
+        if path is None:
+            return None
+        return [(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in path]
+
+    def search(self, source, target):
+        """
+        A* search between two person indices.
+
+        Returns a list of (movie, person) index pairs, or None.
+        """
+        graph = self.graph
+        if graph.component_of(source) != graph.component_of(target):
+            return None
+
+        h = self.heuristic(target)
+
+        parents = {source: None}
+        cost = {source: 0}
+        heap = [(h(source), 0, source)]
+        while heap:
+            _, g, person = heapq.heappop(heap)
+            if person == target:
+                return join(target, parents, {target: None})
+            if g > cost[person]:
+                continue
+            for movie in graph.movies_of(person):
+                for neighbor in graph.stars_of(movie):
+                    if neighbor not in cost or g + 1 < cost[neighbor]:
+                        cost[neighbor] = g + 1
+                        parents[neighbor] = (movie, person)
+                        heapq.heappush(
+                            heap, (g + 1 + h(neighbor), g + 1, neighbor)
+                        )
+        return None
+
+
+def distances_from(graph, start):
+    """
+    Returns a bytearray of BFS distances from person index start
+    to every person, saturating at UNREACHABLE - 1.
+    """
+    distances = bytearray([UNREACHABLE]) * len(graph.person_ids)
+    distances[start] = 0
+    relax(graph, distances, [start])
+    return distances
+
+
+def relax(graph, distances, layer):
+    """
+    Lowers distances by BFS outwards from the people in layer,
+    which must all be at the same distance, saturating at
+    UNREACHABLE - 1.
+    """
+    depth = distances[layer[0]] if layer else 0
+    seen_movies = set()
+    while layer:
+        depth = min(depth + 1, UNREACHABLE - 1)
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if movie in seen_movies:
+                    continue
+                seen_movies.add(movie)
+                for neighbor in graph.stars_of(movie):
+                    if distances[neighbor] > depth:
+                        distances[neighbor] = depth
+                        next_layer.append(neighbor)
+        layer = next_layer
@@ -0,0 +1,160 @@
+from array import array
+from bisect import bisect_left
+
+# Characters tried when generating one-edit variants of a query
+ALPHABET = "abcdefghijklmnopqrstuvwxyz .-'"
+
+# Most prefix matches looked at before ranking
+PREFIX_SCAN = 1000
+
+# Names sharing a prefix with a query few enough to compare one by one
+TYPO_SCAN = 64
+
+
+class NameIndex():
+    """
+    Sorted index of lowercase person names in a StarGraph, for
+    non-interactive exact, prefix and typo-tolerant name lookup.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        order = sorted(range(len(graph.names)),
+                       key=lambda person: graph.names[person].lower())
+        # keys[i] is the lowercase name of person index people[i]
+        self.keys = [graph.names[person].lower() for person in order]
+        self.people = array("i", order)
+
+    def add(self, person):
+        """Inserts a person index added to the graph after the index was built."""
+        key = self.graph.names[person].lower()
+        i = bisect_left(self.keys, key)
+        self.keys.insert(i, key)
+        self.people.insert(i, person)
+
+    def exact(self, name):
+        """Returns the person indices whose name is name, ignoring case."""
+        key = name.lower()
+        i = bisect_left(self.keys, key)
+        matches = []
+        while i < len(self.keys) and self.keys[i] == key:
+            matches.append(self.people[i])
+            i += 1
+        return matches
+
+    def prefix(self, name):
+        """
+        Returns person indices whose name starts with name, ignoring case.
+        At most PREFIX_SCAN matches are returned.
+        """
+        key = name.lower()
+        i = bisect_left(self.keys, key)
+        matches = []
+        while (i < len(self.keys) and len(matches) < PREFIX_SCAN
+               and self.keys[i].startswith(key)):
+            matches.append(self.people[i])
+            i += 1
+        return matches
+
+    def typos(self, name):
+        """
+        Returns person indices whose name is one edit away from name.
+
+        An edit at position i keeps the first i characters, so its
+        matches are among the names sharing that prefix. Going along
+        the name, that range of names narrows until it is small enough
+        to compare each of them with name directly.
+        """
+        keys, people = self.keys, self.people
+        word = name.lower()
+        # Edits at different positions can give the same name
+        matches = set()
+        # keys[lo:hi] are the names starting with word[:i]
+        lo, hi = 0, len(keys)
+        for i in range(len(word) + 1):
+            if hi - lo <= TYPO_SCAN:
+                for j in range(lo, hi):
+                    if one_edit(word, keys[j]):
+                        matches.add(people[j])
+                return list(matches)
+
+            # Variants are visited in order so each search starts at the last
+            j = lo
+            for variant in sorted(edits_at(word, i)):
+                j = bisect_left(keys, variant, j, hi)
+                while j < hi and keys[j] == variant:
+                    matches.add(people[j])
+                    j += 1
+
+            if i < len(word):
+                prefix = word[:i + 1]
+                lo = bisect_left(keys, prefix, lo, hi)
+                hi = bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1),
+                                 lo, hi)
+        return list(matches)
+
+    def lookup(self, name, limit=10):
+        """
+        Returns up to limit candidate person_ids for name, ranked with
+        exact matches first, then prefix matches, then one-edit typos.
+        Within each group people with more movies come first.
+
+        Typos are only looked for if nobody has exactly that name and
+        there are fewer than limit prefix matches.
+        """
+        exact = self.exact(name)
+        ranked = self.ranked(exact, set())
+        if len(ranked) < limit:
+            ranked += self.ranked(self.prefix(name), set(ranked))
+        if not exact and len(ranked) < limit:
+            ranked += self.ranked(self.typos(name), set(ranked))
+        return [self.graph.person_ids[person] for person in ranked[:limit]]
+
+    def ranked(self, group, seen):
+        """
+        Returns the person indices in group but not in seen, without
+        repeats, those with more movies first.
+        """
+        group = [person for person in set(group) if person not in seen]
+        group.sort(key=self.popularity, reverse=True)
+        return group
+
+    def popularity(self, person):
+        """Returns the number of movies of a person index."""
+        return self.graph.movie_count(person)
+
+
+def edits_at(word, i):
+    """
+    Returns the set of strings one deletion, transposition,
+    substitution or insertion at position i away from word.
+    """
+    letters = set(ALPHABET) | set(word)
+    a, b = word[:i], word[i:]
+    variants = {a + c + b for c in letters}
+    if b:
+        variants.add(a + b[1:])
+        variants.update(a + c + b[1:] for c in letters)
+    if len(b) > 1:
+        variants.add(a + b[1] + b[0] + b[2:])
+    variants.discard(word)
+    return variants
+
+
+def one_edit(word, other):
+    """
+    Returns True if other is one deletion, transposition,
+    substitution or insertion away from word.
+    """
+    if word == other or abs(len(word) - len(other)) > 1:
+        return False
+    i = 0
+    while i < min(len(word), len(other)) and word[i] == other[i]:
+        i += 1
+    if len(word) > len(other):
+        return word[i + 1:] == other[i:]
+    if len(word) < len(other):
+        return word[i:] == other[i + 1:]
+    return (word[i + 1:] == other[i + 1:]
+            or (word[i + 2:] == other[i + 2:]
+                and word[i:i + 2] == other[i + 1:i + 2] + other[i:i + 1]))
@@ -0,0 +1,179 @@
+import heapq
+
+
+class ShortestPathDAG():
+    """
+    Every shortest path between two people in a StarGraph, held as the
+    parent DAG of a single BFS layering from source.
+
+    For each person on the last layers, parent_movies[person] lists the
+    movies that reach them from the previous layer, and
+    movie_parents[movie] lists that movie's stars on the previous layer.
+    """
+
+    def __init__(self, graph, source, target):
+        self.graph = graph
+        self.source = graph.person_index[source]
+        self.target = graph.person_index[target]
+        self.parent_movies = {}
+        self.movie_parents = {}
+        self.connected = self.layer()
+
+    def layer(self):
+        """
+        Runs BFS from source one whole layer at a time until target is
+        reached, recording parents. Returns False if it never is.
+        """
+        graph = self.graph
+        source, target = self.source, self.target
+        if source == target:
+            return True
+        if graph.component_of(source) != graph.component_of(target):
+            return False
+
+        depth = {source: 0}
+        seen_movies = set()
+        layer = [source]
+        while layer:
+            next_layer = []
+            for person in layer:
+                for movie in graph.movies_of(person):
+
+                    # A movie seen on an earlier layer adds no new people
+                    if movie in seen_movies:
+                        continue
+                    seen_movies.add(movie)
+
+                    stars = list(graph.stars_of(movie))
+                    parents = [star for star in stars
+                               if depth.get(star) == depth[person]]
+                    self.movie_parents[movie] = parents
+                    for star in stars:
+                        if star not in depth:
+                            depth[star] = depth[person] + 1
+                            next_layer.append(star)
+                        if depth[star] == depth[person] + 1:
+                            self.parent_movies.setdefault(star, []).append(
+                                movie
+                            )
+            if target in depth:
+                return True
+            layer = next_layer
+        return False
+
+    def steps(self, person):
+        """Yields (movie, parent) index pairs one layer back from person."""
+        for movie in self.parent_movies.get(person, []):
+            for parent in self.movie_parents[movie]:
+                yield movie, parent
+
+    def paths(self):
+        """
+        Lazily yields every shortest list of (movie_id, person_id) pairs
+        from source to target, in no particular order.
+
+        Only the path being built is held in memory, so this is safe
+        even when the number of paths is huge.
+        """
+        if not self.connected:
+            return
+        path = []
+        stack = [(self.target, self.steps(self.target))]
+        while stack:
+            person, steps = stack[-1]
+            if person == self.source:
+                yield self.named(path)
+                stack.pop()
+                if path:
+                    path.pop()
+                continue
+            step = next(steps, None)
+            if step is None:
+                stack.pop()
+                if path:
+                    path.pop()
+                continue
+            movie, parent = step
+            path.append((movie, person))
+            stack.append((parent, self.steps(parent)))
+
+    def best_paths(self, k, score=None):
+        """
+        Returns the k shortest paths with the highest total movie score,
+        best first, as lists of (movie_id, person_id) pairs.
+
+        score maps a movie index to a number; by default, the number of
+        stars of the movie, as a stand-in for how well known it is.
+        """
+        if not self.connected:
+            return []
+        if score is None:
+            score = self.graph.star_count
+
+        # Highest score of any path from source to each person in the DAG
+        best = {}
+
+        def best_to(person):
+            stack = [person]
+            while stack:
+                person = stack[-1]
+                if person in best:
+                    stack.pop()
+                    continue
+                if person == self.source:
+                    best[person] = 0
+                    stack.pop()
+                    continue
+                missing = [parent for _, parent in self.steps(person)
+                           if parent not in best]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                best[person] = max(score(movie) + best[parent]
+                                   for movie, parent in self.steps(person))
+                stack.pop()
+            return best[person]
+
+        # Best-first search backwards from target; a partial path's
+        # priority is its exact score plus the best possible remainder
+        paths = []
+        count = 0
+        heap = [(-best_to(self.target), count, 0, self.target, ())]
+        while heap and len(paths) < k:
+            _, _, total, person, path = heapq.heappop(heap)
+            if person == self.source:
+                paths.append(self.named(path))
+                continue
+            for movie, parent in self.steps(person):
+                count += 1
+                gained = total + score(movie)
+                heapq.heappush(heap, (
+                    -(gained + best_to(parent)), count, gained, parent,
+                    path + ((movie, person),)
+                ))
+        return paths
+
+    def named(self, path):
+        """
+        Converts a target-to-source list of (movie, person) index pairs
+        into a source-to-target list of (movie_id, person_id) pairs.
+        """
+        graph = self.graph
+        return [(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in reversed(path)]
+
+
+def all_shortest_paths(graph, source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs
+    connecting source to target in graph.
+    """
+    return ShortestPathDAG(graph, source, target).paths()
+
+
+def best_shortest_paths(graph, source, target, k, score=None):
+    """
+    Returns the k best shortest paths connecting source to target in
+    graph, ranked by total movie score (see ShortestPathDAG.best_paths).
+    """
+    return ShortestPathDAG(graph, source, target).best_paths(k, score)
@@ -0,0 +1,199 @@
+import csv
+import json
+import socketserver
+import sys
+import traceback
+
+import degrees
+from paths import best_shortest_paths
+
+# Fields every row of an update must have, as in the CSV files
+UPDATE_FIELDS = {
+    "people": ["id", "name", "birth"],
+    "movies": ["id", "title", "year"],
+    "stars": ["person_id", "movie_id"]
+}
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python server.py [directory] [port]")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    port = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    # Load data once for the lifetime of the server
+    print("Loading data...", file=sys.stderr)
+    degrees.load_graph(directory)
+    print("Data loaded.", file=sys.stderr)
+
+    if port is None:
+        serve(sys.stdin, sys.stdout)
+    else:
+        with socketserver.TCPServer(("127.0.0.1", port), Handler) as server:
+            print(f"Listening on 127.0.0.1:{port}", file=sys.stderr)
+            server.serve_forever()
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """Answers JSON line requests from one socket connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            response = answer_line(line.decode("utf-8"))
+            self.wfile.write((response + "\n").encode("utf-8"))
+
+
+def serve(lines, out):
+    """
+    Answers each JSON request line from lines with one JSON
+    response line written to out.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        out.write(answer_line(line) + "\n")
+        out.flush()
+
+
+def answer_line(line):
+    """
+    Returns the JSON response to one JSON request line.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return json.dumps({"error": "invalid JSON"})
+    if not isinstance(request, dict):
+        return json.dumps({"error": "request must be an object"})
+    try:
+        return json.dumps(answer(request))
+    except Exception as e:
+        # One failed request must not stop the server answering others
+        traceback.print_exc()
+        response = {}
+        if "id" in request:
+            response["id"] = request["id"]
+        response["error"] = f"internal error: {e}"
+        return json.dumps(response)
+
+
+def answer(request):
+    """
+    Answers one request.
+
+    {"source": ..., "target": ...} asks for the shortest path between two
+    people, each given by IMDB id or by name, and answers with "degrees"
+    and "path" (a list of [movie_id, person_id] pairs, or null if they are
+    not connected).
+    {"command": "bounds", "source": ..., "target": ...} answers with
+    "lower" and "upper" bounds on the degrees from the landmark index.
+    {"command": "paths", "source": ..., "target": ..., "k": ...} answers
+    with up to k shortest "paths", those through the biggest casts first.
+    {"command": "stats"} answers with the path cache counters.
+    {"command": "update", ...} adds the rows given as "people", "movies"
+    and "stars" lists, or read from the CSV files in "directory", to the
+    live graph, and answers with the number "added" of each.
+
+    A person that cannot be resolved to exactly one id gets an "error"
+    with ranked "candidates" ids, including prefix and typo matches.
+
+    An "id" in the request is echoed back in the response.
+    """
+    response = {}
+    if "id" in request:
+        response["id"] = request["id"]
+
+    if request.get("command") == "stats":
+        response["cache"] = degrees.path_cache.stats()
+        return response
+
+    if request.get("command") == "update":
+        if "directory" in request:
+            try:
+                rows = degrees.read_updates(str(request["directory"]))
+            except (OSError, UnicodeDecodeError, csv.Error) as e:
+                response["error"] = f"invalid update: {e}"
+                return response
+        else:
+            rows = {name: request.get(name, []) for name in UPDATE_FIELDS}
+        error = update_error(rows)
+        if error is not None:
+            response["error"] = f"invalid update: {error}"
+            return response
+        response["added"] = degrees.apply_updates(
+            rows["people"], rows["movies"], rows["stars"]
+        )
+        return response
+
+    ids = []
+    for field in ["source", "target"]:
+        if field not in request:
+            response["error"] = f"missing {field}"
+            return response
+        person_ids = resolve(str(request[field]))
+        if len(person_ids) != 1:
+            if person_ids:
+                response["error"] = f"{field} is ambiguous"
+            else:
+                response["error"] = f"{field} not found"
+                person_ids = degrees.graph.search_names(str(request[field]))
+            response["candidates"] = person_ids
+            return response
+        ids.append(person_ids[0])
+
+    source, target = ids
+    response["source"] = source
+    response["target"] = target
+
+    if request.get("command") == "bounds":
+        if degrees.landmarks is None:
+            degrees.load_landmarks()
+        response["lower"], response["upper"] = degrees.landmarks.bounds(
+            source, target
+        )
+        return response
+
+    if request.get("command") == "paths":
+        k = request.get("k", 10)
+        if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+            response["error"] = "k must be a positive integer"
+            return response
+        paths = best_shortest_paths(degrees.graph, source, target, k)
+        response["paths"] = [[list(step) for step in path] for path in paths]
+        return response
+
+    path = degrees.cached_shortest_path(source, target)
+    response["degrees"] = None if path is None else len(path)
+    response["path"] = None if path is None else [list(step) for step in path]
+    return response
+
+
+def update_error(rows):
+    """
+    Returns what is wrong with the "people", "movies" and "stars" rows
+    of an update, or None if every row has all its fields as strings.
+    """
+    for name, fields in UPDATE_FIELDS.items():
+        if not isinstance(rows[name], list):
+            return f"{name} must be a list"
+        for row in rows[name]:
+            if not isinstance(row, dict):
+                return f"{name} rows must be objects"
+            for field in fields:
+                if not isinstance(row.get(field), str):
+                    return f"{name} rows need a string {field}"
+    return None
+
+
+def resolve(person):
+    """
+    Returns the person_ids matching person, taken as an IMDB id
+    if there is one, otherwise as a name.
+    """
+    if person in degrees.graph.person_index:
+        return [person]
+    return degrees.graph.person_ids_for_name(person)
+
+
+if __name__ == "__main__":
+    main()
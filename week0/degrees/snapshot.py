@@ -0,0 +1,237 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from graph import StarGraph
+
+MAGIC = b"DEGSNAP3"
+FILENAME = "degrees.snapshot"
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# StarGraph attributes stored in a snapshot
+ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_people",
+          "components", "component_sizes"]
+STRINGS = ["person_ids", "names", "births", "movie_ids", "titles", "years"]
+
+# Id -> index dicts stored as tables of indices sorted by id
+INDEXES = {"person_index": "person_ids", "movie_index": "movie_ids"}
+
+# Arrays are laid out on this boundary so they can be cast in place
+ALIGNMENT = 8
+
+
+class StringTable():
+    """
+    A list of strings stored back to back as UTF-8 in a snapshot,
+    string i being data[offsets[i]:offsets[i + 1]]. Strings are only
+    decoded when accessed. Strings appended later are kept in a list.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+        self.count = len(offsets) - 1
+        self.extra = []
+
+    def __len__(self):
+        return self.count + len(self.extra)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i >= self.count:
+            return self.extra[i - self.count]
+        if i < 0:
+            raise IndexError("string index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, string):
+        self.extra.append(string)
+
+
+class IdIndex():
+    """
+    Maps ids to indices like a dict, by binary search over order,
+    the indices of a StringTable of ids sorted by id. Ids added
+    later are kept in a dict.
+    """
+
+    def __init__(self, ids, order):
+        self.ids = ids
+        self.order = order
+        self.extra = {}
+
+    def get(self, id, default=None):
+        if id in self.extra:
+            return self.extra[id]
+        i = bisect_left(self.order, id, key=self.ids.__getitem__)
+        if i < len(self.order) and self.ids[self.order[i]] == id:
+            return self.order[i]
+        return default
+
+    def __getitem__(self, id):
+        index = self.get(id)
+        if index is None:
+            raise KeyError(id)
+        return index
+
+    def __contains__(self, id):
+        return self.get(id) is not None
+
+    def __setitem__(self, id, index):
+        self.extra[id] = index
+
+    def __len__(self):
+        return len(self.order) + len(self.extra)
+
+    def items(self):
+        for index in self.order:
+            yield self.ids[index], index
+        yield from self.extra.items()
+
+
+def source_key(directory):
+    """
+    Returns the sizes and modification times of the CSV files in directory,
+    used to tell whether a snapshot is still up to date.
+    """
+    key = []
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        key.append([name, stat.st_size, stat.st_mtime_ns])
+    return key
+
+
+def save(graph, path, key=None):
+    """
+    Writes graph to a single snapshot file at path.
+
+    The file is a small JSON header followed by sections of raw bytes:
+    each string table as concatenated UTF-8 with an array of offsets,
+    a table of indices sorted by id for each id index, and the CSR arrays.
+    """
+    sections = {}
+    for name in STRINGS:
+        encoded = [string.encode("utf-8") for string in getattr(graph, name)]
+        offsets = array("i", [0])
+        for string in encoded:
+            offsets.append(offsets[-1] + len(string))
+        sections[name] = b"".join(encoded)
+        sections[f"{name}_offsets"] = offsets.tobytes()
+    for name in INDEXES:
+        sections[name] = array(
+            "i", [index for _, index in sorted(getattr(graph, name).items())]
+        ).tobytes()
+    for name in ARRAYS:
+        sections[name] = memoryview(getattr(graph, name)).tobytes()
+
+    # Work out where each section starts relative to the data area
+    layout = {}
+    offset = 0
+    for name, blob in sections.items():
+        offset = align(offset)
+        layout[name] = [offset, len(blob)]
+        offset += len(blob)
+
+    header = json.dumps({
+        "key": key,
+        "byteorder": sys.byteorder,
+        "itemsize": array("i").itemsize,
+        "sections": layout
+    }).encode("utf-8")
+    start = align(len(MAGIC) + 8 + len(header))
+
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, blob in sections.items():
+            f.write(b"\0" * (start + layout[name][0] - f.tell()))
+            f.write(blob)
+    os.replace(temp, path)
+
+
+def load(path):
+    """
+    Loads a snapshot written by save through a read-only memory map,
+    without reading or decoding any section up front.
+
+    Returns (graph, key), or (None, None) if the file is not an intact
+    snapshot usable on this machine.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None, None
+            length, = struct.unpack("<Q", f.read(8))
+            if length > os.fstat(f.fileno()).st_size:
+                return None, None
+            header = json.loads(f.read(length).decode("utf-8"))
+            if (header["byteorder"] != sys.byteorder
+                    or header["itemsize"] != array("i").itemsize):
+                return None, None
+            start = align(len(MAGIC) + 8 + length)
+            data = memoryview(
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            )
+
+        def section(name):
+            offset, size = header["sections"][name]
+            if start + offset + size > len(data):
+                raise ValueError(f"truncated section {name}")
+            return data[start + offset:start + offset + size]
+
+        graph = StarGraph()
+        for name in STRINGS:
+            setattr(graph, name, StringTable(
+                section(name), section(f"{name}_offsets").cast("i")
+            ))
+        for name, ids in INDEXES.items():
+            setattr(graph, name, IdIndex(getattr(graph, ids),
+                                         section(name).cast("i")))
+        for name in ARRAYS:
+            setattr(graph, name, section(name).cast("i"))
+        return graph, header["key"]
+    except (ValueError, KeyError, TypeError, OverflowError, struct.error):
+        # Covers bad JSON, UTF-8 and casts as well as missing fields
+        return None, None
+
+
+def load_cached(directory, path=None):
+    """
+    Returns the StarGraph for the CSV files in directory.
+
+    Loads it from the snapshot at path (default: FILENAME inside directory)
+    if that snapshot matches the current CSV sizes and modification times,
+    otherwise parses the CSVs and writes a fresh snapshot.
+    """
+    if path is None:
+        path = os.path.join(directory, FILENAME)
+    key = source_key(directory)
+
+    if os.path.exists(path):
+        graph, cached_key = load(path)
+        if graph is not None and cached_key == key:
+            return graph
+
+    graph = StarGraph.from_csv(directory)
+    try:
+        save(graph, path, key)
+    except OSError:
+        # A read-only data directory just means no cache
+        pass
+    return graph
+
+
+def align(offset):
+    """Rounds offset up to the next multiple of ALIGNMENT."""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
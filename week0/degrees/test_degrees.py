@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+import degrees
+import server
+import snapshot
+
+DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+
+
+class SnapshotUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, snapshot.FILENAME)
+
+        # The first load writes the snapshot, the second maps it read-only
+        snapshot.load_cached(DIRECTORY, path)
+        degrees.graph = snapshot.load_cached(DIRECTORY, path)
+        degrees.landmarks = None
+        degrees.path_cache.clear()
+
+    def tearDown(self):
+        degrees.graph = None
+        self.directory.cleanup()
+
+    def test_star_update_merges_components(self):
+        graph = degrees.graph
+        self.assertIsInstance(graph.component_sizes, memoryview)
+        self.assertFalse(graph.connected("914612", "102"))
+        size = graph.component_size("102") + graph.component_size("914612")
+
+        added = degrees.apply_updates(
+            [], [], [{"person_id": "914612", "movie_id": "112384"}]
+        )
+        self.assertEqual(added, {"people": 0, "movies": 0, "stars": 1})
+        self.assertTrue(graph.connected("914612", "102"))
+        self.assertEqual(graph.component_size("914612"), size)
+        self.assertEqual(degrees.shortest_path("914612", "102"),
+                         [("112384", "102")])
+
+    def test_server_update(self):
+        response = server.answer({
+            "command": "update",
+            "stars": [{"person_id": "914612", "movie_id": "112384"}]
+        })
+        self.assertEqual(response["added"],
+                         {"people": 0, "movies": 0, "stars": 1})
+
+        response = server.answer({"command": "update", "stars": [["914612"]]})
+        self.assertEqual(response["error"],
+                         "invalid update: stars rows must be objects")
+
+
+class SnapshotLoadTest(unittest.TestCase):
+
+    def test_corrupt_snapshot_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, snapshot.FILENAME)
+            with open(path, "wb") as f:
+                f.write(snapshot.MAGIC + b"\x20\0\0\0\0\0\0\0{not json")
+            graph = snapshot.load_cached(DIRECTORY, path)
+            self.assertEqual(graph.person("102")["name"], "Kevin Bacon")
+
+            graph = snapshot.load_cached(DIRECTORY, path)
+            self.assertIsInstance(graph.component_sizes, memoryview)
+            self.assertEqual(graph.person("102")["name"], "Kevin Bacon")
+            self.assertNotIn("0", graph.person_index)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,6 @@
+from collections import OrderedDict, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -37,3 +40,101 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier backed by a deque with a hashed index of states,
+    so add, remove and contains_state are all O(1).
+
+    Keeps counters of pushes, pops and the peak frontier size.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        # Maps state to number of nodes in the frontier with that state
+        self.states = {}
+        self.pushes = 0
+        self.pops = 0
+        self.peak = 0
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+        self.pushes += 1
+        if len(self.frontier) > self.peak:
+            self.peak = len(self.frontier)
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self.discard(self.frontier.pop())
+
+    def discard(self, node):
+        """Drops node from the state index and counts the pop."""
+        count = self.states[node.state] - 1
+        if count:
+            self.states[node.state] = count
+        else:
+            del self.states[node.state]
+        self.pops += 1
+        return node
+
+    def stats(self):
+        """Returns the frontier counters as a dict."""
+        return {"pushes": self.pushes, "pops": self.pops, "peak": self.peak}
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self.discard(self.frontier.popleft())
+
+
+class PathCache():
+    """
+    Bounded least-recently-used cache of shortest paths
+    keyed on (source, target) pairs.
+    """
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.paths
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get(self, key):
+        """Returns the cached path for key, marking it recently used."""
+        self.paths.move_to_end(key)
+        self.hits += 1
+        return self.paths[key]
+
+    def put(self, key, path):
+        """Stores path for key, evicting the least recently used entry."""
+        self.misses += 1
+        self.paths[key] = path
+        self.paths.move_to_end(key)
+        if len(self.paths) > self.maxsize:
+            self.paths.popitem(last=False)
+
+    def clear(self):
+        self.paths.clear()
+
+    def stats(self):
+        """Returns the cache counters as a dict."""
+        return {"size": len(self.paths), "hits": self.hits,
+                "misses": self.misses}
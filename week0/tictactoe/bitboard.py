@@ -0,0 +1,193 @@
+"""
+Tic Tac Toe on bitboards
+
+A board is a tuple (x, o) of 9-bit integers, one per player, where
+bit 3 * i + j is set if that player has a mark at (i, j).
+"""
+
+from tictactoe import X, O, EMPTY
+
+FULL = 0b111111111
+
+# Rows, columns and diagonals
+WIN_MASKS = [0b000000111, 0b000111000, 0b111000000,
+             0b001001001, 0b010010010, 0b100100100,
+             0b100010001, 0b001010100]
+
+# For every 9-bit set of marks, whether it contains a line
+WINS = bytes(
+    any(marks & mask == mask for mask in WIN_MASKS) for marks in range(512)
+)
+
+# For every 9-bit set of marks, the number of marks
+COUNTS = bytes(bin(marks).count("1") for marks in range(512))
+
+# The cell bit and (i, j) action of each cell
+CELLS = [(1 << (3 * i + j), (i, j)) for i in range(3) for j in range(3)]
+
+# Maps (x, o) to its minimax value, shared across games
+transposition_table = {}
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return (0, 0)
+
+
+def from_board(board):
+    """
+    Returns the bitboard of a list-of-lists board.
+    """
+    x = o = 0
+    for bit, (i, j) in CELLS:
+        if board[i][j] == X:
+            x |= bit
+        elif board[i][j] == O:
+            o |= bit
+    return (x, o)
+
+
+def to_board(board):
+    """
+    Returns the list-of-lists board of a bitboard.
+    """
+    x, o = board
+    cells = [[EMPTY, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY],
+             [EMPTY, EMPTY, EMPTY]]
+    for bit, (i, j) in CELLS:
+        if x & bit:
+            cells[i][j] = X
+        elif o & bit:
+            cells[i][j] = O
+    return cells
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = board
+    return O if COUNTS[x] > COUNTS[o] else X
+
+
+def actions(board):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    x, o = board
+    taken = x | o
+    return {action for bit, action in CELLS if not taken & bit}
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3):
+        raise Exception("Invalid Action")
+    bit = 1 << (3 * i + j)
+    x, o = board
+    if (x | o) & bit:
+        raise Exception("Invalid Action")
+    if COUNTS[x] > COUNTS[o]:
+        return (x, o | bit)
+    return (x | bit, o)
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = board
+    if WINS[x]:
+        return X
+    if WINS[o]:
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = board
+    return bool(WINS[x] or WINS[o] or x | o == FULL)
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = board
+    if WINS[x]:
+        return 1
+    if WINS[o]:
+        return -1
+    return 0
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    if terminal(board):
+        return None
+
+    x, o = board
+    taken = x | o
+    optimal_action = None
+    if COUNTS[x] == COUNTS[o]:
+        v = -2
+        for bit, action in CELLS:
+            if not taken & bit:
+                temp = value(x | bit, o)
+                if temp > v:
+                    v = temp
+                    optimal_action = action
+    else:
+        v = 2
+        for bit, action in CELLS:
+            if not taken & bit:
+                temp = value(x, o | bit)
+                if temp < v:
+                    v = temp
+                    optimal_action = action
+    return optimal_action
+
+
+def value(x, o):
+    """
+    Returns the minimax value of the position with marks x and o.
+    """
+    key = (x, o)
+    if key in transposition_table:
+        return transposition_table[key]
+
+    if WINS[x]:
+        v = 1
+    elif WINS[o]:
+        v = -1
+    elif x | o == FULL:
+        v = 0
+    else:
+        taken = x | o
+        if COUNTS[x] == COUNTS[o]:
+            v = -1
+            for bit, _ in CELLS:
+                if not taken & bit:
+                    v = max(v, value(x | bit, o))
+                    if v == 1:
+                        break
+        else:
+            v = 1
+            for bit, _ in CELLS:
+                if not taken & bit:
+                    v = min(v, value(x, o | bit))
+                    if v == -1:
+                        break
+    transposition_table[key] = v
+    return v
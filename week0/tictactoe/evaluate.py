@@ -0,0 +1,99 @@
+import json
+import multiprocessing
+import sys
+
+import tictactoe as ttt
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python evaluate.py boards.txt [processes]")
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+
+    with open(sys.argv[1]) as f:
+        keys = (line.strip() for line in f if line.strip())
+        for record in pool_map(evaluate_key, keys, processes):
+            print(json.dumps(record), flush=True)
+
+
+def evaluate_boards(boards, processes=None, chunksize=64):
+    """
+    Yields (move, value) for each board in boards, in input order,
+    evaluated across a pool of processes. Boards may be lists of lists
+    or 9-character strings as made by tictactoe.encode; an invalid
+    board raises ValueError.
+
+    Every worker memory-maps the same opening book, so no position is
+    solved more than once.
+    """
+    return pool_map(evaluate, boards, processes, chunksize)
+
+
+def pool_map(worker, items, processes=None, chunksize=64):
+    """
+    Yields worker(item) for each of items, in order, from a pool of
+    processes that share the opening book.
+    """
+    if not ttt.load_book():
+        ttt.build_book()
+    with multiprocessing.Pool(processes, initializer=init_worker,
+                              initargs=(ttt.BOOK_FILE,)) as pool:
+        yield from pool.imap(worker, items, chunksize)
+
+
+def init_worker(path):
+    ttt.load_book(path)
+
+
+def evaluate(board):
+    """
+    Returns (move, value) for a board: an optimal move for the player
+    to move as [i, j], or None if the game is over, and the minimax value.
+
+    Positions outside the book (unreachable in play) are searched.
+    Raises ValueError if board is not a valid board.
+    """
+    key = board if isinstance(board, str) else ttt.encode(board)
+    error = board_error(key)
+    if error is not None:
+        raise ValueError(error)
+    board = ttt.decode(key)
+    try:
+        move = ttt.book_move(board)
+        value = ttt.book_value(board)
+    except ttt.NotInBook:
+        move = None if ttt.terminal(board) else ttt.alphabeta(board)
+        if ttt.player(board) == ttt.X:
+            value = ttt.maxValue(board)
+        else:
+            value = ttt.minValue(board)
+    return (None if move is None else list(move)), value
+
+
+def evaluate_key(key):
+    """
+    Returns the output record of a board given as a string made by
+    tictactoe.encode: its "board", "move" and "value", or its "board"
+    and an "error" if it is not a valid board.
+    """
+    try:
+        move, value = evaluate(key)
+    except ValueError as e:
+        return {"board": key, "error": str(e)}
+    return {"board": key, "move": move, "value": value}
+
+
+def board_error(key):
+    """
+    Returns what is wrong with a board string, or None if it has
+    9 cells of "-", "X" or "O" with as many X's as O's or one more.
+    """
+    if len(key) != 9 or any(cell not in "-XO" for cell in key):
+        return "board must be 9 cells of -, X or O"
+    if key.count("X") - key.count("O") not in [0, 1]:
+        return "X must have as many marks as O or one more"
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""
+m,n,k-game Player
+
+Generalizes Tic Tac Toe to an m x n board won by k marks in a row,
+for boards where searching the whole game tree is out of reach.
+"""
+
+import time
+
+from tictactoe import X, O, EMPTY
+
+# Score of a won position, ahead of any heuristic evaluation
+WIN = 10 ** 9
+
+# Boards with more cells only search moves next to existing marks
+NEAR_LIMIT = 16
+
+
+class TimeUp(Exception):
+    """Raised inside a search when its time budget runs out."""
+
+
+class MNKGame():
+
+    def __init__(self, m=3, n=3, k=3):
+        """
+        Initialize a game on m rows and n columns, won by k in a row.
+        Precomputes every line of k cells (a "window"), the numbers of
+        the windows through each cell, and the neighbours of each cell.
+        """
+        if k < 1:
+            raise Exception("k must be at least 1")
+        if k > max(m, n):
+            raise Exception("k must fit on the board")
+        self.m = m
+        self.n = n
+        self.k = k
+
+        self.windows = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.windows.append(
+                            [(i + di * s, j + dj * s) for s in range(k)]
+                        )
+        self.cell_windows = {(i, j): [] for i in range(m) for j in range(n)}
+        for w, window in enumerate(self.windows):
+            for cell in window:
+                self.cell_windows[cell].append(w)
+        self.neighbors = {
+            (i, j): [(a, b)
+                     for a in range(max(i - 1, 0), min(i + 2, m))
+                     for b in range(max(j - 1, 0), min(j + 2, n))
+                     if (a, b) != (i, j)]
+            for i in range(m) for j in range(n)
+        }
+
+        # Every cell, nearest the center first
+        center = ((m - 1) / 2, (n - 1) / 2)
+        self.distance = {
+            (i, j): abs(i - center[0]) + abs(j - center[1])
+            for i in range(m) for j in range(n)
+        }
+        self.cells = sorted(self.distance, key=self.distance.get)
+
+        # Heuristic score of a window holding x X's and o O's, VALUES[x][o]
+        self.values = [[4 ** x if o == 0 and x else
+                        -4 ** o if x == 0 and o else 0
+                        for o in range(k + 1)] for x in range(k + 1)]
+
+        # Number of positions searched by the last call to minimax
+        self.nodes_searched = 0
+
+        # Event that stops the running search once set, if any
+        self.cancelled = None
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        x_count = sum(row.count(X) for row in board)
+        o_count = sum(row.count(O) for row in board)
+        return O if x_count > o_count else X
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for i in range(self.m) for j in range(self.n)
+                if board[i][j] == EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if not (0 <= i < self.m and 0 <= j < self.n) or board[i][j] != EMPTY:
+            raise Exception("Invalid Action")
+        board_copy = [row.copy() for row in board]
+        board_copy[i][j] = self.player(board)
+        return board_copy
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        for window in self.windows:
+            i, j = window[0]
+            mark = board[i][j]
+            if mark != EMPTY and all(board[a][b] == mark for a, b in window):
+                return mark
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return (self.winner(board) is not None
+                or all(cell != EMPTY for row in board for cell in row))
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        mark = self.winner(board)
+        if mark == X:
+            return 1
+        elif mark == O:
+            return -1
+        return 0
+
+    def evaluate(self, board):
+        """
+        Returns a heuristic score of a position for X: every window
+        still open to only one player counts for that player, more so
+        the more of it they already hold.
+
+        The search keeps the same score up to date move by move instead.
+        """
+        score = 0
+        for window in self.windows:
+            x_count = 0
+            o_count = 0
+            for i, j in window:
+                if board[i][j] == X:
+                    x_count += 1
+                elif board[i][j] == O:
+                    o_count += 1
+            score += self.values[x_count][o_count]
+        return score
+
+    def minimax(self, board, budget=1.0, max_depth=None, cancelled=None):
+        """
+        Returns the best action found for the current player within
+        budget seconds, by iterative deepening depth-limited search.
+        The search also stops early once the optional threading.Event
+        cancelled is set.
+
+        A move that wins at once, or else the only move that stops the
+        opponent winning at once, is returned without searching.
+
+        Otherwise each pass searches one ply deeper than the last, with
+        alpha-beta pruning and the heuristic evaluation at the depth
+        limit. The answer of the deepest pass that finished in time is
+        returned.
+        """
+        self.nodes_searched = 0
+        if self.terminal(board):
+            return None
+
+        deadline = time.monotonic() + budget
+        self.cancelled = cancelled
+        self.setup(board)
+        current = self.player(board)
+        opponent = O if current == X else X
+        for mark in [current, opponent]:
+            if self.threats[mark]:
+                return min(self.threats[mark], key=self.distance.get)
+
+        moves = self.candidate_moves()
+        if not moves:
+            moves = self.cells[:1]
+        optimal_action = moves[0]
+
+        depth = 1
+        while depth <= (max_depth or self.empty):
+            try:
+                best, v = self.root(current, moves, depth, deadline)
+            except TimeUp:
+                break
+            optimal_action = best
+
+            # Search the best move first on the next, deeper pass
+            moves.remove(best)
+            moves.insert(0, best)
+            if abs(v) >= WIN - self.m * self.n:
+                break
+            depth += 1
+        return optimal_action
+
+    def setup(self, board):
+        """
+        Copies board into the search state kept up to date by place and
+        unplace:
+
+        counts: for X and O, the number of their marks in each window
+        score: the heuristic evaluation of the position for X
+        threats: for X and O, the empty cells that would complete one of
+            their windows, each with the number of windows it completes
+        near: for each cell, the number of marked cells next to it
+        candidates: the empty cells worth searching
+        history: the number of cutoffs each move has caused so far
+        """
+        self.work = [row.copy() for row in board]
+        self.counts = {X: [0] * len(self.windows), O: [0] * len(self.windows)}
+        self.threats = {X: {}, O: {}}
+        self.near = dict.fromkeys(self.distance, 0)
+        self.near_only = self.m * self.n > NEAR_LIMIT
+        self.history = {}
+        self.empty = 0
+        for i in range(self.m):
+            for j in range(self.n):
+                mark = board[i][j]
+                if mark == EMPTY:
+                    self.empty += 1
+                    continue
+                for w in self.cell_windows[(i, j)]:
+                    self.counts[mark][w] += 1
+                for cell in self.neighbors[(i, j)]:
+                    self.near[cell] += 1
+
+        self.score = 0
+        for w in range(len(self.windows)):
+            x_count = self.counts[X][w]
+            o_count = self.counts[O][w]
+            self.score += self.values[x_count][o_count]
+            for mark, count, other in [(X, x_count, o_count),
+                                       (O, o_count, x_count)]:
+                if count == self.k - 1 and other == 0:
+                    self.add_threat(mark, self.open_cell(w))
+
+        self.candidates = {
+            cell for cell in self.distance
+            if self.work[cell[0]][cell[1]] == EMPTY
+            and (self.near[cell] or not self.near_only)
+        }
+
+    def open_cell(self, w):
+        """
+        Returns the first empty cell of window number w.
+        """
+        for i, j in self.windows[w]:
+            if self.work[i][j] == EMPTY:
+                return (i, j)
+
+    def add_threat(self, mark, cell):
+        threats = self.threats[mark]
+        threats[cell] = threats.get(cell, 0) + 1
+
+    def remove_threat(self, mark, cell):
+        threats = self.threats[mark]
+        if threats[cell] == 1:
+            del threats[cell]
+        else:
+            threats[cell] -= 1
+
+    def place(self, action, mark):
+        """
+        Plays action for mark on the search board, updating the search
+        state through only the windows and neighbours of action.
+        Returns True if the move wins.
+        """
+        i, j = action
+        self.work[i][j] = mark
+        self.empty -= 1
+        k = self.k
+        values = self.values
+        x_counts = self.counts[X]
+        o_counts = self.counts[O]
+        counts = self.counts[mark]
+        won = False
+        for w in self.cell_windows[action]:
+            x_count = x_counts[w]
+            o_count = o_counts[w]
+
+            # A window one short of k had action as its only empty cell
+            if x_count == k - 1 and o_count == 0:
+                self.remove_threat(X, action)
+            if o_count == k - 1 and x_count == 0:
+                self.remove_threat(O, action)
+
+            self.score -= values[x_count][o_count]
+            counts[w] += 1
+            x_count = x_counts[w]
+            o_count = o_counts[w]
+            self.score += values[x_count][o_count]
+
+            if x_count == k - 1 and o_count == 0:
+                self.add_threat(X, self.open_cell(w))
+            elif o_count == k - 1 and x_count == 0:
+                self.add_threat(O, self.open_cell(w))
+            elif counts[w] == k:
+                won = True
+
+        self.candidates.discard(action)
+        for cell in self.neighbors[action]:
+            self.near[cell] += 1
+            if self.work[cell[0]][cell[1]] == EMPTY:
+                self.candidates.add(cell)
+        return won
+
+    def unplace(self, action, mark):
+        """
+        Takes back the move of mark at action made by place.
+        """
+        i, j = action
+        k = self.k
+        values = self.values
+        x_counts = self.counts[X]
+        o_counts = self.counts[O]
+        counts = self.counts[mark]
+        for w in self.cell_windows[action]:
+            x_count = x_counts[w]
+            o_count = o_counts[w]
+
+            # Still marked, so this finds the window's other empty cell
+            if x_count == k - 1 and o_count == 0:
+                self.remove_threat(X, self.open_cell(w))
+            elif o_count == k - 1 and x_count == 0:
+                self.remove_threat(O, self.open_cell(w))
+
+            self.score -= values[x_count][o_count]
+            counts[w] -= 1
+            x_count = x_counts[w]
+            o_count = o_counts[w]
+            self.score += values[x_count][o_count]
+
+            if x_count == k - 1 and o_count == 0:
+                self.add_threat(X, action)
+            if o_count == k - 1 and x_count == 0:
+                self.add_threat(O, action)
+
+        self.work[i][j] = EMPTY
+        self.empty += 1
+        for cell in self.neighbors[action]:
+            self.near[cell] -= 1
+            if self.near[cell] == 0 and self.near_only:
+                self.candidates.discard(cell)
+        if self.near[action] or not self.near_only:
+            self.candidates.add(action)
+
+    def candidate_moves(self):
+        """
+        Returns the candidate cells, those that caused the most cutoffs
+        so far first, then nearest the center.
+        """
+        history = self.history
+        distance = self.distance
+        return sorted(self.candidates,
+                      key=lambda cell: (-history.get(cell, 0), distance[cell]))
+
+    def root(self, current, moves, depth, deadline):
+        """
+        Searches each root move to depth. Returns (action, score).
+        """
+        alpha = -WIN - 1
+        best = moves[0]
+        for action in moves:
+            v = -self.negamax(action, current, depth - 1,
+                              -WIN - 1, -alpha, 1, deadline)
+            if v > alpha:
+                alpha = v
+                best = action
+        return best, alpha
+
+    def negamax(self, action, mark, depth, alpha, beta, ply, deadline):
+        """
+        Plays action for mark, scores the position for the opponent,
+        then takes the move back.
+        """
+        self.nodes_searched += 1
+        if time.monotonic() > deadline or (
+            self.cancelled is not None and self.cancelled.is_set()
+        ):
+            raise TimeUp
+
+        won = self.place(action, mark)
+        try:
+            if won:
+                return -(WIN - ply)
+            if self.empty == 0:
+                return 0
+            opponent = O if mark == X else X
+
+            # The opponent wins with their next move
+            if self.threats[opponent]:
+                return WIN - ply - 1
+            if depth == 0:
+                return self.score if opponent == X else -self.score
+
+            # The opponent must block, and cannot block two cells at once
+            forced = self.threats[mark]
+            if len(forced) > 1:
+                return -(WIN - ply - 2)
+            moves = list(forced) if forced else self.candidate_moves()
+
+            v = -WIN - 1
+            for move in moves:
+                v = max(v, -self.negamax(move, opponent, depth - 1,
+                                         -beta, -alpha, ply + 1, deadline))
+                alpha = max(alpha, v)
+                if alpha >= beta:
+                    self.history[move] = self.history.get(move, 0) + depth
+                    break
+            return v
+        finally:
+            self.unplace(action, mark)
+
+    def wins(self, board, action, mark):
+        """
+        Returns True if mark has k in a row through action.
+        """
+        for w in self.cell_windows[action]:
+            if all(board[i][j] == mark for i, j in self.windows[w]):
+                return True
+        return False
+
+    def ordered_actions(self, board):
+        """
+        Returns the empty cells worth searching, nearest the center first.
+
+        On an empty board that is just the center. On boards of more than
+        NEAR_LIMIT cells, only cells next to an existing mark are
+        considered, unless there are none.
+        """
+        empty = []
+        near = []
+        for cell in self.cells:
+            i, j = cell
+            if board[i][j] != EMPTY:
+                continue
+            empty.append(cell)
+            if any(board[a][b] != EMPTY for a, b in self.neighbors[cell]):
+                near.append(cell)
+
+        if len(empty) == len(self.cells):
+            return empty[:1]
+        if self.m * self.n > NEAR_LIMIT and near:
+            return near
+        return empty
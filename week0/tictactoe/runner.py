@@ -1,9 +1,48 @@
 import pygame
 import sys
+import threading
 import time
 
 import tictactoe as ttt
 
+# Answer AI moves from the opening book, building it on first run
+if not ttt.load_book():
+    try:
+        ttt.build_book()
+        ttt.load_book()
+    except OSError:
+        # Without a writable book file, minimax searches instead
+        pass
+
+
+class AIWorker():
+    """
+    Computes the AI's move on a background thread,
+    so the window keeps rendering while it thinks.
+    """
+
+    def __init__(self, board):
+        self.move = None
+        self.done = threading.Event()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(board,),
+                                       daemon=True)
+        self.thread.start()
+
+    def run(self, board):
+        # Pause briefly so the move doesn't appear instantly
+        if self.cancelled.wait(0.5):
+            return
+        move = ttt.minimax(board, cancelled=self.cancelled)
+        if not self.cancelled.is_set():
+            self.move = move
+            self.done.set()
+
+    def cancel(self):
+        """Stops the search and discards the move, e.g. on reset."""
+        self.cancelled.set()
+
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -19,7 +58,7 @@ moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+ai_worker = None
 
 while True:
 
@@ -102,7 +141,8 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = "." * (int(time.time() * 3) % 4)
+            title = f"Computer thinking{dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
@@ -110,13 +150,11 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_worker is None:
+                ai_worker = AIWorker(board)
+            elif ai_worker.done.is_set():
+                board = ttt.result(board, ai_worker.move)
+                ai_worker = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -127,20 +165,23 @@ while True:
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+        # Offer a reset during play too, even while the computer thinks
+        againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+        again = mediumFont.render("Play Again" if game_over else "Reset",
+                                  True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        click, _, _ = pygame.mouse.get_pressed()
+        if click == 1:
+            mouse = pygame.mouse.get_pos()
+            if againButton.collidepoint(mouse):
+                time.sleep(0.2)
+                user = None
+                board = ttt.initial_state()
+                if ai_worker is not None:
+                    ai_worker.cancel()
+                ai_worker = None
 
     pygame.display.flip()
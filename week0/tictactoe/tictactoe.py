@@ -4,13 +4,81 @@ Tic Tac Toe Player
 
 import math
 import copy
+import mmap
+import os
 import random
+import sys
 
 X = "X"
 O = "O"
 EMPTY = None
 
 
+def symmetries():
+    """
+    Returns the 8 rotations and reflections of the board, each as a
+    tuple of the cell index (3 * i + j) that moves to each cell.
+    """
+    permutations = []
+    for rotation in range(4):
+        for reflect in [False, True]:
+            permutation = []
+            for i in range(3):
+                for j in range(3):
+                    row, column = i, 2 - j if reflect else j
+                    for _ in range(rotation):
+                        row, column = column, 2 - row
+                    permutation.append(3 * row + column)
+            permutations.append(tuple(permutation))
+    return permutations
+
+
+SYMMETRIES = symmetries()
+
+# Moves tried first by alpha-beta search: center, corners, then edges
+MOVE_ORDER = [(1, 1),
+              (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# The rows, columns and diagonals through each cell, so a search
+# only checks the lines through the last move for a win
+LINES = ([[(i, j) for j in range(3)] for i in range(3)]
+         + [[(i, j) for i in range(3)] for j in range(3)]
+         + [[(0, 0), (1, 1), (2, 2)], [(0, 2), (1, 1), (2, 0)]])
+LINES_THROUGH = {(i, j): [line for line in LINES if (i, j) in line]
+                 for i in range(3) for j in range(3)}
+
+# Number of positions evaluated by the last minimax search
+nodes_searched = 0
+
+# Event that stops the running minimax search once set, if any
+cancel_event = None
+
+# Maps canonical board encodings to their minimax value,
+# shared by every game played in this process
+transposition_table = {}
+
+
+class NotInBook(Exception):
+    """Raised when the opening book has no entry for a board."""
+
+
+class Cancelled(Exception):
+    """Raised inside a search when its cancel event is set."""
+
+
+# Opening book file written by build_book
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Book byte of a position with no move left to make
+NO_MOVE = 0x0F
+
+# Opening book loaded by load_book: one byte per position, indexed by the
+# base-3 code of its canonical encoding, holding the best move's cell in
+# the low 4 bits and the minimax value + 1 in the high bits (0xFF if absent)
+book = None
+
+
 def initial_state():
     """
     Returns starting state of the board.
@@ -80,6 +148,8 @@ def winner(board):
     # Check the rows
     for row in board:
         player_type = row[0]
+        if player_type == EMPTY:
+            continue
         player_count = 0
         for item in row:
             if item == player_type:
@@ -92,6 +162,8 @@ def winner(board):
     # Check the columns
     for column in range(3):
         player_type = board[0][column]
+        if player_type == EMPTY:
+            continue
         player_count = 0
         for row in range(3):
             if board[row][column] == player_type:
@@ -102,6 +174,8 @@ def winner(board):
             return player_type
 
     # Check diagonals
+    if board[1][1] == EMPTY:
+        return None
     if board[0][0] == board[1][1] and board[0][0] == board[2][2]:
         return board[0][0]
     elif board[0][2] == board[1][1] and board[0][2] == board[2][0]:
@@ -133,10 +207,35 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def minimax(board, pruning=False, in_place=False, cancelled=None):
     """
     Returns the optimal action for the current player on the board.
+
+    If pruning is True, searches with alpha-beta pruning instead
+    of the memoized full search. If in_place is True, searches with
+    alpha-beta pruning on a single board that moves are made on and
+    taken back from (see search). Otherwise, if an opening book is
+    loaded, answers from it without searching.
+
+    cancelled is an optional threading.Event; once it is set, the
+    search stops at the next position and minimax returns None.
+    """
+    global nodes_searched, cancel_event
+    nodes_searched = 0
+    cancel_event = cancelled
+    try:
+        return best_action(board, pruning, in_place)
+    except Cancelled:
+        return None
+    finally:
+        cancel_event = None
+
+
+def best_action(board, pruning, in_place):
+    """
+    Returns the optimal action on the board, as described in minimax.
     """
+
     if terminal(board) == True:
         return None
 
@@ -144,6 +243,19 @@ def minimax(board):
     if board == [[EMPTY]*3]*3:
         return (random.randint(0,2), random.randint(0,2))
 
+    if in_place:
+        return search(board)
+
+    if pruning:
+        return alphabeta(board)
+
+    if book is not None:
+        try:
+            return book_move(board)
+        except NotInBook:
+            # Unreachable positions are searched instead
+            pass
+
     # X = MAX, O = MIN
     current_player = player(board)
     action_list = actions(board)
@@ -169,22 +281,316 @@ def minimax(board):
     return optimal_action
 
 
+def count_node():
+    """
+    Counts a position searched, stopping the search if it is cancelled.
+    """
+    global nodes_searched
+    nodes_searched += 1
+    if cancel_event is not None and cancel_event.is_set():
+        raise Cancelled
+
+
+def encode(board):
+    """
+    Returns the board as a string of 9 cells, row by row.
+    """
+    return "".join(cell or "-" for row in board for cell in row)
+
+
+def decode(key):
+    """
+    Returns the board of a string made by encode.
+    """
+    return [[EMPTY if cell == "-" else cell for cell in key[row:row + 3]]
+            for row in range(0, 9, 3)]
+
+
+def canonical(board):
+    """
+    Returns one encoding shared by the board and all its rotations
+    and reflections, which have the same minimax value.
+    """
+    cells = encode(board)
+    return min("".join(cells[i] for i in symmetry) for symmetry in SYMMETRIES)
+
+
 def maxValue(board):
+    count_node()
+
+    key = canonical(board)
+    if key in transposition_table:
+        return transposition_table[key]
+
+    if terminal(board):
+        v = utility(board)
+    else:
+        v = float("-inf")
+        for action in actions(board):
+            v = max(v, minValue(result(board, action)))
+    transposition_table[key] = v
+    return v
+
+
+def minValue(board):
+    count_node()
+
+    key = canonical(board)
+    if key in transposition_table:
+        return transposition_table[key]
+
+    if terminal(board):
+        v = utility(board)
+    else:
+        v = float("inf")
+        for action in actions(board):
+            v = min(v, maxValue(result(board, action)))
+    transposition_table[key] = v
+    return v
+
+
+def ordered_actions(board):
+    """
+    Returns the available actions on the board in MOVE_ORDER.
+    """
+    return [(i, j) for i, j in MOVE_ORDER if board[i][j] == EMPTY]
+
+
+def alphabeta(board):
+    """
+    Returns the optimal action for the current player on the board,
+    searched with alpha-beta pruning.
+    """
+    alpha = float("-inf")
+    beta = float("inf")
+    optimal_action = None
+
+    if player(board) == X:
+        v = float("-inf")
+        for action in ordered_actions(board):
+            temp = alphabetaMin(result(board, action), alpha, beta)
+            if temp > v:
+                v = temp
+                optimal_action = action
+            alpha = max(alpha, v)
+    else:
+        v = float("inf")
+        for action in ordered_actions(board):
+            temp = alphabetaMax(result(board, action), alpha, beta)
+            if temp < v:
+                v = temp
+                optimal_action = action
+            beta = min(beta, v)
+
+    return optimal_action
+
+
+def alphabetaMax(board, alpha, beta):
+    count_node()
+
     if terminal(board):
         return utility(board)
 
     v = float("-inf")
-    for action in actions(board):
-        v = max(v, minValue(result(board, action)))
+    for action in ordered_actions(board):
+        v = max(v, alphabetaMin(result(board, action), alpha, beta))
+        if v >= beta:
+            return v
+        alpha = max(alpha, v)
     return v
 
 
-def minValue(board):
+def alphabetaMin(board, alpha, beta):
+    count_node()
+
     if terminal(board):
         return utility(board)
 
     v = float("inf")
-    for action in actions(board):
-        v = min(v, maxValue(result(board, action)))
+    for action in ordered_actions(board):
+        v = min(v, alphabetaMax(result(board, action), alpha, beta))
+        if v <= alpha:
+            return v
+        beta = min(beta, v)
     return v
 
+
+def canonical_symmetry(board):
+    """
+    Returns the canonical encoding of the board along with the symmetry
+    that produces it, so that canonical cell c is board cell symmetry[c].
+    """
+    cells = encode(board)
+    return min(("".join(cells[i] for i in symmetry), symmetry)
+               for symmetry in SYMMETRIES)
+
+
+def book_index(key):
+    """
+    Returns the base-3 code of a board encoding.
+    """
+    index = 0
+    for cell in key:
+        index = index * 3 + "-XO".index(cell)
+    return index
+
+
+def build_book(path=BOOK_FILE):
+    """
+    Solves every position reachable from the initial state and writes
+    the best move and value of each canonical one to path.
+    """
+    table = bytearray([0xFF]) * 3 ** 9
+    frontier = [initial_state()]
+    while frontier:
+        board = frontier.pop()
+        key = canonical(board)
+        index = book_index(key)
+        if table[index] != 0xFF:
+            continue
+
+        # Solve the canonical board itself, so the move is in its frame
+        canonical_board = decode(key)
+        if terminal(canonical_board):
+            table[index] = NO_MOVE | (utility(canonical_board) + 1) << 4
+            continue
+
+        best = None
+        for action in ordered_actions(canonical_board):
+            child = result(canonical_board, action)
+            v = maxValue(child) if player(child) == X else minValue(child)
+            if (best is None
+                    or (player(canonical_board) == X and v > best[0])
+                    or (player(canonical_board) == O and v < best[0])):
+                best = (v, action)
+        v, (i, j) = best
+        table[index] = (3 * i + j) | (v + 1) << 4
+
+        for action in actions(board):
+            frontier.append(result(board, action))
+
+    with open(path, "wb") as f:
+        f.write(table)
+
+
+def load_book(path=BOOK_FILE):
+    """
+    Memory-maps the opening book at path so minimax answers by lookup.
+    Returns False if there is no book file.
+    """
+    global book
+    if not os.path.exists(path):
+        return False
+    with open(path, "rb") as f:
+        book = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return True
+
+
+def book_move(board):
+    """
+    Returns the opening book's optimal action on the board,
+    or None if the game is over. Raises NotInBook for a board
+    that cannot be reached in play.
+    """
+    key, symmetry = canonical_symmetry(board)
+    entry = book[book_index(key)]
+    if entry == 0xFF:
+        raise NotInBook("Position not in opening book")
+    if entry & 0x0F == NO_MOVE:
+        return None
+    cell = symmetry[entry & 0x0F]
+    return (cell // 3, cell % 3)
+
+
+def book_value(board):
+    """
+    Returns the opening book's minimax value of the board.
+    Raises NotInBook for a board that cannot be reached in play.
+    """
+    entry = book[book_index(canonical(board))]
+    if entry == 0xFF:
+        raise NotInBook("Position not in opening book")
+    return (entry >> 4) - 1
+
+
+def search(board):
+    """
+    Returns the optimal action for the current player on the board,
+    searched with alpha-beta pruning.
+
+    Moves are made on and taken back from one copy of the board, and
+    the number of marks is tracked as the search goes, so beyond the
+    copy no boards, action sets or lists are allocated per position.
+    """
+    work = [row.copy() for row in board]
+    count = 0
+    for row in board:
+        for cell in row:
+            if cell != EMPTY:
+                count += 1
+    mark = player(board)
+
+    alpha = -2
+    beta = 2
+    optimal_action = None
+    for cell in MOVE_ORDER:
+        i, j = cell
+        if work[i][j] != EMPTY:
+            continue
+        work[i][j] = mark
+        v = searchValue(work, cell, count + 1, alpha, beta)
+        work[i][j] = EMPTY
+        if mark == X and v > alpha:
+            alpha = v
+            optimal_action = cell
+        elif mark == O and v < beta:
+            beta = v
+            optimal_action = cell
+    return optimal_action
+
+
+def searchValue(board, last, count, alpha, beta):
+    """
+    Returns the minimax value of the board, given that last was the
+    cell of the latest move and count cells are marked.
+    """
+    count_node()
+
+    i, j = last
+    mark = board[i][j]
+    for (a, b), (c, d), (e, f) in LINES_THROUGH[last]:
+        if board[a][b] == mark and board[c][d] == mark and board[e][f] == mark:
+            return 1 if mark == X else -1
+    if count == 9:
+        return 0
+
+    if mark == O:
+        v = -1
+        for cell in MOVE_ORDER:
+            i, j = cell
+            if board[i][j] != EMPTY:
+                continue
+            board[i][j] = X
+            v = max(v, searchValue(board, cell, count + 1, alpha, beta))
+            board[i][j] = EMPTY
+            if v >= beta:
+                return v
+            alpha = max(alpha, v)
+    else:
+        v = 1
+        for cell in MOVE_ORDER:
+            i, j = cell
+            if board[i][j] != EMPTY:
+                continue
+            board[i][j] = O
+            v = min(v, searchValue(board, cell, count + 1, alpha, beta))
+            board[i][j] = EMPTY
+            if v <= alpha:
+                return v
+            beta = min(beta, v)
+    return v
+
+
+if __name__ == "__main__":
+    # Build step for the opening book
+    build_book(sys.argv[1] if len(sys.argv) > 1 else BOOK_FILE)
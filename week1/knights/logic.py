@@ -1,7 +1,21 @@
 import itertools
+import weakref
 
 
 class Sentence():
+    """
+    Sentences are hash-consed: structurally equal sentences are one
+    shared, immutable object, with its hash and symbols computed once
+    at construction, so sentences compare and hash in constant time.
+
+    The exception is a conjunction made by And(...), which can still
+    be added to; it is interned once it becomes part of another sentence.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Maps (class, arguments) to the live sentence built from them
+    interned = weakref.WeakValueDictionary()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +27,41 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self._symbols)
+
+    def __hash__(self):
+        return self._hash
+
+    def __setattr__(self, name, value):
+        # A built sentence may be shared by any number of others
+        if hasattr(self, "_symbols"):
+            raise AttributeError("sentences cannot be changed")
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences cannot be changed")
+
+    def __getstate__(self):
+        # Everything is rebuilt from __getnewargs__
+        return None
+
+    @classmethod
+    def intern(cls, *arguments):
+        """Returns the one sentence of this class built from arguments."""
+        key = (cls,) + arguments
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            sentence.build(*arguments)
+            Sentence.interned[key] = sentence
+        return sentence
+
+    @classmethod
+    def freeze(cls, sentence):
+        """Returns the interned sentence equal to sentence."""
+        if isinstance(sentence, And) and not sentence.shared:
+            return And.intern(*sentence.conjuncts)
+        return sentence
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +91,18 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
+    def __new__(cls, name):
+        return cls.intern(name)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def build(self, name):
+        self.name = name
+        self._hash = hash(("symbol", name))
+        self._symbols = frozenset([name])
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __getnewargs__(self):
+        return (self.name,)
 
     def __repr__(self):
         return self.name
@@ -65,20 +116,21 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
-        self.operand = operand
+        return cls.intern(Sentence.freeze(operand))
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def build(self, operand):
+        self.operand = operand
+        self._hash = hash(("not", hash(operand)))
+        self._symbols = operand._symbols
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __getnewargs__(self):
+        return (self.operand,)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,23 +141,39 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts", "shared")
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+
+        # A new conjunction is its own object, so that adding to it
+        # cannot change any other sentence
+        self = object.__new__(cls)
+        self.build(*map(Sentence.freeze, conjuncts))
+        object.__setattr__(self, "shared", False)
+        return self
+
+    def build(self, *conjuncts):
+        self.shared = True
+        self.conjuncts = conjuncts
+        self._hash = hash(
+            ("and", tuple(hash(conjunct) for conjunct in conjuncts))
+        )
+        self._symbols = frozenset().union(
+            *[conjunct._symbols for conjunct in conjuncts]
+        )
+
+    def __getnewargs__(self):
+        return self.conjuncts
 
     def __eq__(self, other):
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        return self._hash
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,8 +182,15 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        if self.shared:
+            raise Exception("cannot add to a conjunction inside a sentence")
         Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        conjunct = Sentence.freeze(conjunct)
+
+        # Reopen this conjunction to build it again, one conjunct longer
+        object.__delattr__(self, "_symbols")
+        self.build(*self.conjuncts, conjunct)
+        object.__setattr__(self, "shared", False)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,23 +201,26 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return cls.intern(*map(Sentence.freeze, disjuncts))
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+    def build(self, *disjuncts):
+        self.disjuncts = disjuncts
+        self._hash = hash(
+            ("or", tuple(hash(disjunct) for disjunct in disjuncts))
         )
+        self._symbols = frozenset().union(
+            *[disjunct._symbols for disjunct in disjuncts]
+        )
+
+    def __getnewargs__(self):
+        return self.disjuncts
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -157,24 +235,24 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
+        return cls.intern(Sentence.freeze(antecedent),
+                          Sentence.freeze(consequent))
+
+    def build(self, antecedent, consequent):
         self.antecedent = antecedent
         self.consequent = consequent
+        self._hash = hash(("implies", hash(antecedent), hash(consequent)))
+        self._symbols = antecedent._symbols | consequent._symbols
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __getnewargs__(self):
+        return (self.antecedent, self.consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,24 +266,23 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
+        return cls.intern(Sentence.freeze(left), Sentence.freeze(right))
+
+    def build(self, left, right):
         self.left = left
         self.right = right
+        self._hash = hash(("biconditional", hash(left), hash(right)))
+        self._symbols = left._symbols | right._symbols
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __getnewargs__(self):
+        return (self.left, self.right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -221,12 +298,29 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def model_check(knowledge, query, engine="enumerate"):
+    """
+    Checks if knowledge base entails query.
+
+    engine "enumerate" checks every model; "compiled" checks every
+    model with a compiled evaluator; "truth-table" evaluates all models
+    at once as bit-parallel truth tables; "sat" asks a SAT solver
+    whether knowledge and not query can both hold.
+    """
+    if engine == "sat":
+        return satisfiable(And(knowledge, Not(query))) is False
+    elif engine == "truth-table":
+        names = sorted(set.union(knowledge.symbols(), query.symbols()))
+        table = TruthTable(names)
+        return table.column(knowledge) & ~table.column(query) == 0
+    elif engine == "compiled":
+        names = sorted(set.union(knowledge.symbols(), query.symbols()))
+        check = compile_sentence(Implication(knowledge, query), names)
+        return all(map(check, itertools.product((True, False),
+                                                repeat=len(names))))
+    elif engine != "enumerate":
+        raise ValueError(f"unknown engine {engine}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -261,3 +355,443 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def compile_sentence(sentence, names):
+    """
+    Compiles sentence into a Python function of one argument, a
+    sequence of truth values in the order of the symbol names in
+    names, that returns the same as sentence.evaluate on that model.
+
+    The function is generated as a single expression, so evaluating
+    it makes no method calls or dict lookups.
+    """
+    index = {name: i for i, name in enumerate(names)}
+
+    def source(sentence):
+        if isinstance(sentence, Symbol):
+            if sentence.name not in index:
+                raise Exception(f"variable {sentence.name} not in model")
+            return f"bool(m[{index[sentence.name]}])"
+        elif isinstance(sentence, Not):
+            return f"(not {source(sentence.operand)})"
+        elif isinstance(sentence, And):
+            if not sentence.conjuncts:
+                return "True"
+            return "(" + " and ".join(map(source, sentence.conjuncts)) + ")"
+        elif isinstance(sentence, Or):
+            if not sentence.disjuncts:
+                return "False"
+            return "(" + " or ".join(map(source, sentence.disjuncts)) + ")"
+        elif isinstance(sentence, Implication):
+            return (f"((not {source(sentence.antecedent)})"
+                    f" or {source(sentence.consequent)})")
+        elif isinstance(sentence, Biconditional):
+            return f"({source(sentence.left)} == {source(sentence.right)})"
+        raise TypeError("must be a logical sentence")
+
+    try:
+        return eval(f"lambda m: {source(sentence)}", {})
+    except (RecursionError, SyntaxError, MemoryError):
+        # Too deeply nested for the parser; fall back to the tree
+        return lambda m: sentence.evaluate(dict(zip(names, m)))
+
+
+class TruthTable():
+    """
+    Evaluates sentences in all 2 ** n models of n symbols at once.
+
+    Model number k assigns the symbol names[i] the value of bit i of k.
+    A column is an integer of 2 ** n bits whose bit k is the value of
+    a sentence in model k, so connectives become bitwise operations on
+    whole columns. Columns take 2 ** n / 8 bytes each, which is fine
+    up to about 26 symbols; only the columns of symbols are kept.
+    """
+
+    def __init__(self, names):
+        self.names = []
+        self.size = 1
+        self.full = 1
+        # Maps symbol names to their columns
+        self.columns = {}
+        self.extend(names)
+
+    def extend(self, names):
+        """
+        Adds the symbols in names that are not in the table yet.
+        Every symbol column is repeated for each combination of
+        values of the new symbols.
+        """
+        added = [name for name in dict.fromkeys(names)
+                 if name not in self.columns]
+        if not added:
+            return
+        size = self.size
+        self.size <<= len(added)
+        self.full = (1 << self.size) - 1
+        for name, column in self.columns.items():
+            self.columns[name] = self.repeat(column, size)
+
+        for name in added:
+            i = len(self.names)
+            self.names.append(name)
+
+            # Blocks of 2 ** i false models then 2 ** i true ones
+            width = 1 << i
+            self.columns[name] = self.repeat(
+                ((1 << width) - 1) << width, 2 * width
+            )
+
+    def repeat(self, column, size):
+        """
+        Returns column, taken from a table of size models, repeated
+        to fill this table.
+        """
+        while size < self.size:
+            column |= column << size
+            size *= 2
+        return column
+
+    def column(self, sentence):
+        """
+        Returns the truth column of sentence. Columns of compound
+        sentences are not kept, since each is as big as the table.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.columns:
+                raise Exception(f"variable {sentence.name} not in model")
+            column = self.columns[sentence.name]
+        elif isinstance(sentence, Not):
+            column = self.full ^ self.column(sentence.operand)
+        elif isinstance(sentence, And):
+            column = self.full
+            for conjunct in sentence.conjuncts:
+                column &= self.column(conjunct)
+        elif isinstance(sentence, Or):
+            column = 0
+            for disjunct in sentence.disjuncts:
+                column |= self.column(disjunct)
+        elif isinstance(sentence, Implication):
+            column = ((self.full ^ self.column(sentence.antecedent))
+                      | self.column(sentence.consequent))
+        elif isinstance(sentence, Biconditional):
+            column = self.full ^ (self.column(sentence.left)
+                                  ^ self.column(sentence.right))
+        else:
+            raise TypeError("must be a logical sentence")
+        return column
+
+    def models(self, column):
+        """Yields the model (a dict) of every set bit of column."""
+        data = column.to_bytes((self.size + 7) // 8, "little")
+        for offset, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                byte ^= low
+                k = offset * 8 + low.bit_length() - 1
+                yield {name: bool(k >> i & 1)
+                       for i, name in enumerate(self.names)}
+
+
+class KnowledgeBase():
+    """
+    A conjunction of facts that answers any number of queries.
+
+    Its models are kept as one truth column (see TruthTable), narrowed
+    as each fact is added, so asking whether it entails a query only
+    evaluates the query.
+    """
+
+    def __init__(self, *sentences):
+        self.knowledge = And()
+        self.table = TruthTable([])
+        self.column = self.table.full
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds sentence as a fact."""
+        Sentence.validate(sentence)
+        self.knowledge.add(sentence)
+        self.extend(sentence.symbols())
+        self.column &= self.table.column(sentence)
+
+    def ask(self, query):
+        """Returns True if the knowledge base entails query."""
+        Sentence.validate(query)
+        self.extend(query.symbols())
+        return self.column & ~self.table.column(query) == 0
+
+    def extend(self, names):
+        """Adds any new symbols in names to the truth table."""
+        size = self.table.size
+        self.table.extend(sorted(names))
+        self.column = self.table.repeat(self.column, size)
+
+    def models(self):
+        """Yields every model (a dict) of the knowledge base."""
+        return self.table.models(self.column)
+
+
+def models(sentence, names=None):
+    """
+    Yields every model (dict of symbol name to truth value) in which
+    sentence is true, over the symbols in names, by default those of
+    the sentence.
+    """
+    if names is None:
+        names = sorted(sentence.symbols())
+    table = TruthTable(names)
+    return table.models(table.column(sentence))
+
+
+def satisfiable(sentence):
+    """
+    Returns a model (dict of symbol name to truth value) in which the
+    sentence is true, or False if there is none.
+    """
+    cnf = CNF()
+    cnf.assert_true(sentence)
+    solution = solve(cnf.clauses, cnf.count)
+    if solution is None:
+        return False
+    return {name: solution[var] for name, var in cnf.variables.items()}
+
+
+class CNF():
+    """
+    Tseitin conversion of sentences to clauses in conjunctive normal form.
+
+    Each symbol and each compound subsentence gets a variable, numbered
+    from 1; a literal is a variable or its negation, and a clause is a
+    list of literals of which at least one must hold.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.count = 0
+        # Maps symbol names to their variables
+        self.variables = {}
+        # Maps subsentences already converted to their literals
+        self.literals = {}
+
+    def variable(self):
+        self.count += 1
+        return self.count
+
+    def assert_true(self, sentence):
+        """Adds clauses that hold exactly when sentence is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.assert_true(conjunct)
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to sentence, adding the clauses
+        that define it.
+        """
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.variable()
+            literal = self.variables[sentence.name]
+        elif isinstance(sentence, Not):
+            literal = -self.literal(sentence.operand)
+        elif isinstance(sentence, And):
+            literal = self.conjunction(
+                [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            )
+        elif isinstance(sentence, Or):
+            literal = -self.conjunction(
+                [-self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            literal = -self.conjunction([self.literal(sentence.antecedent),
+                                         -self.literal(sentence.consequent)])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            literal = self.variable()
+            self.clauses.extend([[-literal, -a, b], [-literal, a, -b],
+                                 [literal, a, b], [literal, -a, -b]])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.literals[sentence] = literal
+        return literal
+
+    def conjunction(self, literals):
+        """Returns a new variable that is true iff all literals are."""
+        v = self.variable()
+        for literal in literals:
+            self.clauses.append([-v, literal])
+        self.clauses.append([v] + [-literal for literal in literals])
+        return v
+
+
+def solve(clauses, count):
+    """
+    Conflict-driven clause learning SAT solver over variables 1..count.
+
+    Propagates unit clauses through two watched literals per clause,
+    learns a first-UIP clause from each conflict and backjumps, and
+    branches on the most active variable with its last phase.
+
+    Returns a list of truth values indexed by variable, or None if
+    the clauses are unsatisfiable.
+    """
+    # 1 true, -1 false, 0 unassigned, per variable
+    assignment = [0] * (count + 1)
+    level = [0] * (count + 1)
+    reason = [None] * (count + 1)
+    activity = [0.0] * (count + 1)
+    phase = [-1] * (count + 1)
+    increment = 1.0
+    trail = []
+    # Trail length at the start of each decision level
+    levels = []
+    # Maps each literal to the clauses watching it
+    watches = {}
+    head = 0
+
+    def value(literal):
+        v = assignment[abs(literal)]
+        return v if literal > 0 else -v
+
+    def assign(literal, cause):
+        var = abs(literal)
+        assignment[var] = 1 if literal > 0 else -1
+        level[var] = len(levels)
+        reason[var] = cause
+        trail.append(literal)
+
+    def watch(clause):
+        watches.setdefault(clause[0], []).append(clause)
+        watches.setdefault(clause[1], []).append(clause)
+
+    def propagate():
+        """Returns a conflicting clause, or None."""
+        nonlocal head
+        while head < len(trail):
+            false = -trail[head]
+            head += 1
+            watching = watches.get(false, [])
+            kept = []
+            conflict = None
+            for clause in watching:
+                if conflict is not None:
+                    kept.append(clause)
+                    continue
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if value(clause[0]) == 1:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    if value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value(clause[0]) == -1:
+                        conflict = clause
+                    else:
+                        assign(clause[0], clause)
+            watches[false] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def analyze(conflict):
+        """Returns the first-UIP learnt clause and the level to jump to."""
+        nonlocal increment
+        seen = set()
+        learnt = [None]
+        pending = 0
+        literal = None
+        index = len(trail) - 1
+        clause = conflict
+        while True:
+            for other in clause:
+                var = abs(other)
+                if other == literal or var in seen or level[var] == 0:
+                    continue
+                seen.add(var)
+                activity[var] += increment
+                if level[var] == len(levels):
+                    pending += 1
+                else:
+                    learnt.append(other)
+            while abs(trail[index]) not in seen:
+                index -= 1
+            literal = trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = reason[abs(literal)]
+        learnt[0] = -literal
+        increment *= 1.05
+
+        if len(learnt) == 1:
+            return learnt, 0
+        # Watch the literal assigned last after the asserting one
+        top = max(range(1, len(learnt)), key=lambda i: level[abs(learnt[i])])
+        learnt[1], learnt[top] = learnt[top], learnt[1]
+        return learnt, level[abs(learnt[1])]
+
+    def backjump(target):
+        nonlocal head
+        while len(levels) > target:
+            start = levels.pop()
+            for literal in trail[start:]:
+                var = abs(literal)
+                phase[var] = assignment[var]
+                assignment[var] = 0
+                reason[var] = None
+            del trail[start:]
+        head = min(head, len(trail))
+
+    # Load clauses, dropping repeats and tautologies
+    for clause in clauses:
+        clause = list(dict.fromkeys(clause))
+        if any(-literal in clause for literal in clause):
+            continue
+        if not clause:
+            return None
+        if len(clause) == 1:
+            if value(clause[0]) == -1:
+                return None
+            if value(clause[0]) == 0:
+                assign(clause[0], None)
+            continue
+        watch(clause)
+
+    while True:
+        conflict = propagate()
+        if conflict is not None:
+            if not levels:
+                return None
+            learnt, target = analyze(conflict)
+            backjump(target)
+            if len(learnt) == 1:
+                assign(learnt[0], None)
+            else:
+                watch(learnt)
+                assign(learnt[0], learnt)
+            continue
+
+        # Branch on the most active unassigned variable
+        var = 0
+        for v in range(1, count + 1):
+            if assignment[v] == 0 and (var == 0 or activity[v] > activity[var]):
+                var = v
+        if var == 0:
+            return [False] + [assignment[v] == 1 for v in range(1, count + 1)]
+        levels.append(len(trail))
+        assign(var * phase[var], None)